@@ -0,0 +1,35 @@
+"""
+图像处理实验室引擎
+
+与 Streamlit 无关的处理基础设施：算子注册表、结果缓存、流水线执行器和分块并行执行。
+页面和命令行工具都通过这里调用实验室的处理函数。
+"""
+from .cache import ResultCache, compute_image_hash, make_cache_key, estimate_nbytes, freeze_result
+from .registry import ParamSpec, Operator, OperatorRegistry
+from .pipeline import PipelineExecutor
+from .lab_operators import LAB_OPERATORS, build_lab_registry
+from .tiling import run_tiled, tile_grid
+from .pointops import PointOp, apply_point_ops, compile_lut
+from .edgefilter import edge_preserving_filter
+from . import config
+
+__all__ = [
+    "ResultCache",
+    "compute_image_hash",
+    "make_cache_key",
+    "estimate_nbytes",
+    "freeze_result",
+    "ParamSpec",
+    "Operator",
+    "OperatorRegistry",
+    "PipelineExecutor",
+    "LAB_OPERATORS",
+    "build_lab_registry",
+    "run_tiled",
+    "tile_grid",
+    "PointOp",
+    "apply_point_ops",
+    "compile_lut",
+    "edge_preserving_filter",
+    "config",
+]
@@ -0,0 +1,298 @@
+"""
+批量处理
+
+对一个文件夹或 ZIP 包中的全部图像执行同一个算子（或算子流水线），
+任务分发到进程池并行计算，结果边算边写入输出 ZIP，并统计每张图像的耗时和整体吞吐量。
+
+命令行用法:
+    python -m lab_engine.batch examples --step clahe:clip_limit=3 --output clahe.zip
+    python -m lab_engine.batch photos.zip --step saturation:factor=1.3 --step van_gogh --workers 4
+    python -m lab_engine.batch --list
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from . import config
+from .decoding import decode_image_bytes
+from .lab_operators import build_lab_registry
+from .loader import load_lab_namespace
+
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff', '.tif')
+OUTPUT_FORMATS = ("png", "jpg")
+REPORT_NAME = "batch_report.json"
+
+_worker_registry = None
+
+
+def iter_batch_sources(source):
+    """
+    逐个读取待处理图像
+
+    参数:
+    - source: 文件夹路径、ZIP 文件路径或 ZIP 文件对象
+
+    返回: 生成 (相对路径, 文件字节) 的迭代器，按路径排序
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for file in files:
+                if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.append(os.path.relpath(os.path.join(root, file), source))
+        for path in sorted(paths):
+            with open(os.path.join(source, path), "rb") as f:
+                yield path.replace(os.sep, "/"), f.read()
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        names = sorted(
+            info.filename for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            and info.filename.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+        for name in names:
+            yield name, archive.read(name)
+
+
+def parse_step(text):
+    """
+    解析命令行中的算子步骤
+
+    格式: 算子名[:参数=值,参数=值]，值按 JSON 解析（如 3、1.5、true、[8,8]），解析失败时视为字符串
+    """
+    name, _, arguments = text.partition(":")
+    params = {}
+    for item in filter(None, arguments.split(",")):
+        key, separator, value = item.partition("=")
+        if not separator:
+            raise ValueError(f"参数格式应为 名称=值: {item}")
+        try:
+            params[key.strip()] = json.loads(value)
+        except ValueError:
+            params[key.strip()] = value
+    return name.strip(), params
+
+
+def validate_steps(steps, registry=None):
+    """规范化流水线参数；批量处理的每一步都必须返回单张图像"""
+    registry = registry or build_lab_registry({})
+    if not steps:
+        raise ValueError("至少需要指定一个算子")
+    canonical = []
+    for name, params in steps:
+        if registry.get(name).returns != "image":
+            raise ValueError(f"算子 {name} 不返回单张图像，不能用于批量处理")
+        canonical.append((name, registry.canonical_params(name, params)))
+    return canonical
+
+
+def _init_worker(page_path, single_thread):
+    """进程池初始化：加载处理函数；多进程并行时每个进程内部只用一个线程，避免超额订阅"""
+    global _worker_registry
+    if single_thread:
+        # 子进程中没有 Streamlit 运行时，处理函数里的 st.* 调用会反复打印警告
+        logging.getLogger("streamlit").setLevel(logging.ERROR)
+        config.TILE_WORKERS = 1
+        cv2.setNumThreads(1)
+    _worker_registry = build_lab_registry(load_lab_namespace(page_path))
+
+
+def _process_image(name, data, steps, output_format):
+    """解码、执行流水线并编码单张图像，返回处理记录（失败时记录错误而不抛出）"""
+    # started 为墙钟时间，各进程之间可比较，用于统计去掉启动开销后的处理时段
+    record = {"name": name, "width": 0, "height": 0, "seconds": 0.0, "error": None, "data": None,
+              "started": time.time()}
+    start = time.perf_counter()
+    try:
+        # 与页面相同的解码方式（PIL），结果与在页面中处理同一文件一致
+        image = decode_image_bytes(data)[1]
+        record["height"], record["width"] = image.shape[:2]
+
+        result = image
+        for step_name, params in steps:
+            result = _worker_registry.resolve(step_name)(result, **params)
+
+        ok, encoded = cv2.imencode("." + output_format, np.ascontiguousarray(result))
+        if not ok:
+            raise ValueError("结果编码失败")
+        record["data"] = encoded.tobytes()
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def _output_name(name, output_format, used):
+    """结果在 ZIP 中的文件名：保留相对路径，扩展名换成输出格式，重名时追加序号"""
+    stem = os.path.splitext(name)[0]
+    candidate = f"{stem}.{output_format}"
+    index = 1
+    while candidate in used:
+        candidate = f"{stem}_{index}.{output_format}"
+        index += 1
+    used.add(candidate)
+    return candidate
+
+
+def summarize(records, elapsed, workers, started=None):
+    """
+    汇总每张图像的耗时和整体吞吐量
+
+    进程池启动、各进程加载页面属于固定开销，单独记为 startup_seconds；
+    吞吐量按处理时段（第一张图像开始到最后一张结束）计算。
+    started 为批处理开始时的墙钟时间，省略时不区分启动开销。
+    """
+    succeeded = [record for record in records if record["error"] is None]
+    latencies = np.array([record["seconds"] for record in succeeded]) if succeeded else np.zeros(1)
+    megapixels = sum(record["width"] * record["height"] for record in succeeded) / 1e6
+    processing = elapsed
+    startup = 0.0
+    if started is not None and records:
+        first = min(record["started"] for record in records)
+        processing = max(record["started"] + record["seconds"] for record in records) - first
+        startup = max(0.0, first - started)
+    return {
+        "images": len(records),
+        "succeeded": len(succeeded),
+        "failed": len(records) - len(succeeded),
+        "workers": workers,
+        "elapsed_seconds": elapsed,
+        "startup_seconds": startup,
+        "processing_seconds": processing,
+        "images_per_second": len(succeeded) / processing if processing > 0 else 0.0,
+        "megapixels_per_second": megapixels / processing if processing > 0 else 0.0,
+        "latency_mean": float(latencies.mean()),
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p95": float(np.percentile(latencies, 95)),
+        "latency_max": float(latencies.max()),
+    }
+
+
+def run_batch(source, steps, output, workers=None, output_format="png", on_result=None, page_path=None):
+    """
+    批量处理
+
+    参数:
+    - source: 文件夹路径、ZIP 文件路径或 ZIP 文件对象
+    - steps: [(算子名, 参数字典), ...]
+    - output: 输出 ZIP 的路径或可写文件对象
+    - workers: 进程数，默认取配置 LAB_BATCH_WORKERS；为 1 时在当前进程内串行处理
+    - output_format: 结果图像格式（png 或 jpg）
+    - on_result: 每完成一张图像调用一次 on_result(record, completed)
+    - page_path: 实验室页面路径，默认使用仓库中的页面
+
+    返回: {"summary": 汇总统计, "records": 每张图像的处理记录}
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    steps = validate_steps(steps)
+    workers = workers or config.BATCH_WORKERS or os.cpu_count() or 1
+    start = time.perf_counter()
+    started = time.time()
+
+    # 单进程时直接在当前进程内串行处理，省去进程启动开销
+    if workers == 1:
+        _init_worker(page_path, single_thread=False)
+
+    records = []
+    used_names = set()
+
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+        # 1. 结果逐张写入 ZIP（图像已是压缩格式，不再重复压缩）
+        def collect(record):
+            data = record.pop("data")
+            if data is not None:
+                record["output"] = _output_name(record["name"], output_format, used_names)
+                archive.writestr(record["output"], data)
+            records.append(record)
+            if on_result is not None:
+                on_result(record, len(records))
+
+        # 2. 单进程串行处理
+        if workers == 1:
+            for name, data in iter_batch_sources(source):
+                collect(_process_image(name, data, steps, output_format))
+        else:
+            # 3. 多进程：限制在途任务数，内存中最多同时保留 2×workers 张图像
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(page_path, True)) as pool:
+                pending = set()
+                for name, data in iter_batch_sources(source):
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result())
+                    pending.add(pool.submit(_process_image, name, data, steps, output_format))
+                for future in wait(pending).done:
+                    collect(future.result())
+
+        # 4. 汇总报告也写入 ZIP
+        summary = summarize(records, time.perf_counter() - start, workers, started)
+        report = {"steps": steps, "summary": summary, "records": records}
+        archive.writestr(REPORT_NAME, json.dumps(report, ensure_ascii=False, indent=2))
+
+    return {"summary": summary, "records": records}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m lab_engine.batch",
+        description="对文件夹或 ZIP 中的全部图像执行实验室算子",
+    )
+    parser.add_argument("source", nargs="?", help="图像文件夹或 ZIP 文件")
+    parser.add_argument("--step", action="append", default=[], metavar="NAME[:k=v,...]",
+                        help="算子及参数，可重复指定以组成流水线")
+    parser.add_argument("--output", default="batch_results.zip", help="输出 ZIP 路径")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认按 CPU 核数）")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="png", help="结果图像格式")
+    parser.add_argument("--list", action="store_true", help="列出可用于批量处理的算子")
+    args = parser.parse_args(argv)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    registry = build_lab_registry({})
+    if args.list:
+        for operator in registry:
+            if operator.returns == "image":
+                params = ", ".join(f"{spec.name}={spec.default!r}" for spec in operator.params)
+                print(f"{operator.name:32s} {operator.label}  {params}")
+        return 0
+    if not args.source or not args.step:
+        parser.error("需要指定 source 和至少一个 --step")
+
+    try:
+        steps = validate_steps([parse_step(text) for text in args.step], registry)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e))
+
+    def report(record, completed):
+        if record["error"] is None:
+            print(f"[{completed}] {record['name']}  {record['width']}x{record['height']}  "
+                  f"{record['seconds'] * 1000:.0f} ms")
+        else:
+            print(f"[{completed}] {record['name']}  失败: {record['error']}", file=sys.stderr)
+
+    result = run_batch(args.source, steps, args.output, args.workers, args.format, on_result=report)
+    summary = result["summary"]
+    print(f"完成 {summary['succeeded']}/{summary['images']} 张，用时 {summary['elapsed_seconds']:.2f} s"
+          f"（启动 {summary['startup_seconds']:.2f} s，处理 {summary['processing_seconds']:.2f} s），"
+          f"{summary['workers']} 个进程")
+    print(f"吞吐量 {summary['images_per_second']:.2f} 张/s，{summary['megapixels_per_second']:.2f} MP/s；"
+          f"单张耗时 平均 {summary['latency_mean'] * 1000:.0f} ms，"
+          f"P95 {summary['latency_p95'] * 1000:.0f} ms，最大 {summary['latency_max'] * 1000:.0f} ms")
+    print(f"结果已写入 {args.output}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+"""
+图像处理函数基准测试
+
+在合成图像和 examples/ 素材上，按多个分辨率运行实验室页面中的全部
+apply_* / add_* / extract_* 函数，记录耗时、峰值常驻内存（RSS）和 Python/NumPy 内存分配峰值，
+结果保存为 JSON 基线；之后可与基线对比，超过阈值的变慢或内存增长会被标记为性能回退。
+
+命令行用法:
+    python -m lab_engine.benchmark run --output baseline.json
+    python -m lab_engine.benchmark run --sizes 0.3,2 --functions "apply_*style" --output current.json
+    python -m lab_engine.benchmark compare baseline.json current.json --threshold 0.2
+    python -m lab_engine.benchmark filters --sizes 2,8 --backends bilateral,guided,dt,fgs
+"""
+import argparse
+import fnmatch
+import inspect
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from . import config
+from .cache import clear_content_caches
+from .edgefilter import BACKENDS
+from .lab_operators import LAB_OPERATORS
+from .loader import load_lab_namespace
+from .profiling import read_rss, reset_peak_rss
+
+DEFAULT_SIZES = (0.3, 2.0, 8.0, 20.0)
+FUNCTION_PREFIXES = ("apply_", "add_", "extract_")
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+SYNTHETIC = "synthetic"
+RANDOM_SEED = 2024
+
+# 使用保边平滑的风格函数及对比时的附加参数
+FILTER_STYLES = (
+    ("apply_impressionist_effect", {}),
+    ("apply_pastel_effect", {}),
+    ("apply_ink_wash_painting_effect", {"paper_texture": False}),
+    ("apply_comic_effect", {}),
+    ("apply_watercolor_effect", {"style": "modern"}),
+    ("apply_monet_style", {}),
+)
+
+
+# ----------------------------------------------------------------------
+# 测试图像
+# ----------------------------------------------------------------------
+def target_shape(megapixels, aspect=4 / 3):
+    """给定像素数（百万）和宽高比，返回 (高, 宽)"""
+    height = int(round((megapixels * 1e6 / aspect) ** 0.5))
+    return height, int(round(height * aspect))
+
+
+def make_synthetic_image(height, width, seed=RANDOM_SEED):
+    """生成带渐变、几何图形和噪声的合成图像，保证边缘、角点和纹理类算法都有响应"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = np.empty((height, width, 3), np.float32)
+    image[:, :, 0] = 128 + 80 * np.sin(x / width * 6 * np.pi)
+    image[:, :, 1] = 128 + 80 * np.cos(y / height * 4 * np.pi)
+    image[:, :, 2] = 255 * (x + y) / (width + height)
+    image = image.astype(np.uint8)
+
+    scale = max(height, width) / 1000
+    for _ in range(40):
+        color = tuple(int(value) for value in rng.integers(0, 256, 3))
+        cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(20, 120) * scale) + 1
+        if rng.random() < 0.5:
+            cv2.rectangle(image, (cx, cy), (cx + size, cy + size), color, -1)
+        else:
+            cv2.circle(image, (cx, cy), size // 2, color, -1)
+
+    noise = rng.integers(-12, 13, image.shape, dtype=np.int16)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def load_benchmark_image(source, megapixels):
+    """按目标像素数准备测试图像：合成图像直接生成，素材图像按原宽高比缩放"""
+    if source == SYNTHETIC:
+        return make_synthetic_image(*target_shape(megapixels))
+    image = cv2.imdecode(np.fromfile(os.path.join(EXAMPLES_DIR, source), np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"无法读取素材图像: {source}")
+    height, width = target_shape(megapixels, image.shape[1] / image.shape[0])
+    interpolation = cv2.INTER_AREA if height * width < image.shape[0] * image.shape[1] else cv2.INTER_CUBIC
+    return cv2.resize(image, (width, height), interpolation=interpolation)
+
+
+def example_names():
+    return sorted(name for name in os.listdir(EXAMPLES_DIR)
+                  if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff')))
+
+
+# ----------------------------------------------------------------------
+# 待测函数
+# ----------------------------------------------------------------------
+def collect_functions(namespace, patterns=None):
+    """
+    收集待测函数及调用参数
+
+    只收集页面中定义的函数（页面导入的库函数如 apply_point_ops 不计入）；
+    注册表中有声明的函数使用算子的默认参数，其余函数使用签名中的默认值；
+    存在无默认值的参数时跳过（返回的参数为 None）。
+
+    返回: [(函数名, 函数, 参数字典或 None), ...]
+    """
+    defaults = {operator.func_name: operator.default_params() for operator in LAB_OPERATORS}
+    functions = []
+    for name in sorted(namespace):
+        func = namespace[name]
+        if not name.startswith(FUNCTION_PREFIXES) or not inspect.isfunction(func):
+            continue
+        if func.__module__ != namespace.get("__name__"):
+            continue
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        params = defaults.get(name)
+        if params is None:
+            parameters = list(inspect.signature(func).parameters.values())[1:]
+            if any(parameter.default is inspect.Parameter.empty for parameter in parameters):
+                params = None
+            else:
+                params = {}
+        functions.append((name, func, params))
+    return functions
+
+
+# ----------------------------------------------------------------------
+# 测量
+# ----------------------------------------------------------------------
+def _call(func, image, params):
+    # 特效函数使用随机数，固定种子保证每次运行的工作量一致
+    random.seed(RANDOM_SEED)
+    np.random.seed(RANDOM_SEED)
+    return func(image.copy(), **params)
+
+
+def _clear_content_caches(func):
+    """
+    清空中间结果缓存，计时的是完整计算而不是缓存命中
+
+    包括 lab_engine 各模块登记的缓存，以及页面中按参数缓存的字典
+    （页面函数的全局命名空间就是加载得到的页面命名空间）。
+    """
+    clear_content_caches()
+    for get_cache in func.__globals__.get("_LAB_CONTENT_CACHES", ()):
+        get_cache().clear()
+
+
+def measure(func, image, params, repeat=3, budget=5.0):
+    """
+    测量单个函数
+
+    参数:
+    - repeat: 最多重复计时的次数
+    - budget: 累计耗时超过该秒数后不再重复（大图上的慢函数只跑一次）
+
+    返回: 测量结果字典
+    """
+    # 1. 计时（不开启 tracemalloc，避免其开销影响耗时）
+    rss_before, _ = read_rss()
+    peak_resettable = reset_peak_rss()
+    times = []
+    while len(times) < repeat:
+        _clear_content_caches(func)
+        start = time.perf_counter()
+        result = _call(func, image, params)
+        times.append(time.perf_counter() - start)
+        del result
+        if sum(times) > budget:
+            break
+    _, peak_rss = read_rss()
+
+    # 2. 单独运行一次统计 Python/NumPy 的内存分配（OpenCV 内部分配不在统计范围内）
+    _clear_content_caches(func)
+    tracemalloc.start()
+    try:
+        result = _call(func, image, params)
+        del result
+        _, alloc_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "runs": len(times),
+        "peak_rss_mb": peak_rss / 2 ** 20,
+        "rss_growth_mb": max(0, peak_rss - rss_before) / 2 ** 20 if peak_resettable else None,
+        "alloc_peak_mb": alloc_peak / 2 ** 20,
+    }
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, images=(SYNTHETIC,), patterns=None, repeat=3, budget=5.0,
+                  on_result=None, page_path=None):
+    """
+    运行基准测试
+
+    参数:
+    - sizes: 测试分辨率（百万像素）
+    - images: 测试图像，SYNTHETIC 表示合成图像，其余为 examples/ 中的文件名
+    - patterns: 函数名通配符列表，None 表示全部函数
+    - on_result: 每完成一项调用一次 on_result(entry)
+
+    返回: 可直接保存为 JSON 的结果字典
+    """
+    namespace = load_lab_namespace(page_path)
+    functions = collect_functions(namespace, patterns)
+    results = []
+    for source in images:
+        for megapixels in sizes:
+            image = load_benchmark_image(source, megapixels)
+            for name, func, params in functions:
+                entry = {"function": name, "image": source, "megapixels": megapixels,
+                         "shape": list(image.shape), "params": params, "error": None}
+                if params is None:
+                    entry["error"] = "需要无默认值的参数，已跳过"
+                else:
+                    try:
+                        entry.update(measure(func, image, params, repeat, budget))
+                    except Exception as e:
+                        entry["error"] = f"{type(e).__name__}: {e}"
+                results.append(entry)
+                if on_result is not None:
+                    on_result(entry)
+            del image
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv_threads": cv2.getNumThreads(),
+            "sizes": list(sizes),
+            "images": list(images),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+# ----------------------------------------------------------------------
+# 保边滤波后端对比
+# ----------------------------------------------------------------------
+def compare_filter_backends(sizes=(2.0,), images=(SYNTHETIC,), backends=BACKENDS, repeat=3, budget=5.0,
+                            on_result=None, page_path=None):
+    """
+    在各风格上对比保边滤波后端的耗时和画质
+
+    每个风格先用双边滤波得到参考输出，其余后端的画质以相对参考输出的 PSNR（dB）衡量。
+
+    返回: 结果记录列表
+    """
+    namespace = load_lab_namespace(page_path)
+    defaults = {name: params for name, _, params in collect_functions(namespace)}
+    saved_backend = config.EDGE_FILTER_BACKEND
+    rows = []
+    try:
+        for source in images:
+            for megapixels in sizes:
+                image = load_benchmark_image(source, megapixels)
+                for name, extra in FILTER_STYLES:
+                    params = dict(defaults.get(name) or {}, **extra)
+                    config.EDGE_FILTER_BACKEND = "bilateral"
+                    reference = _call(namespace[name], image, params)
+                    for backend in backends:
+                        config.EDGE_FILTER_BACKEND = backend
+                        times = []
+                        while len(times) < repeat and sum(times) <= budget:
+                            start = time.perf_counter()
+                            output = _call(namespace[name], image, params)
+                            times.append(time.perf_counter() - start)
+                        row = {"function": name, "image": source, "megapixels": megapixels, "backend": backend,
+                               "seconds_min": min(times), "psnr": cv2.PSNR(reference, output)}
+                        rows.append(row)
+                        if on_result is not None:
+                            on_result(row)
+                del image
+    finally:
+        config.EDGE_FILTER_BACKEND = saved_backend
+    return rows
+
+
+# ----------------------------------------------------------------------
+# 与基线对比
+# ----------------------------------------------------------------------
+def _result_key(entry):
+    return entry["function"], entry["image"], float(entry["megapixels"])
+
+
+def compare_results(baseline, current, threshold=0.2, memory_threshold=0.2, min_seconds=0.005):
+    """
+    对比两次基准测试
+
+    参数:
+    - threshold: 耗时增加超过该比例判定为回退
+    - memory_threshold: 内存分配峰值增加超过该比例判定为回退
+    - min_seconds: 耗时差小于该值时忽略（避免计时噪声）
+
+    返回: 每一项的对比记录列表，status 为 regression / improvement / ok / new / missing / error
+    """
+    baseline_entries = {_result_key(entry): entry for entry in baseline["results"]}
+    current_entries = {_result_key(entry): entry for entry in current["results"]}
+    rows = []
+    for key in sorted(set(baseline_entries) | set(current_entries)):
+        old, new = baseline_entries.get(key), current_entries.get(key)
+        row = {"function": key[0], "image": key[1], "megapixels": key[2], "reasons": []}
+        if old is None or new is None:
+            row["status"] = "new" if old is None else "missing"
+            rows.append(row)
+            continue
+        if old.get("error") or new.get("error"):
+            row["status"] = "error" if new.get("error") and not old.get("error") else "ok"
+            if new.get("error"):
+                row["reasons"].append(new["error"])
+            rows.append(row)
+            continue
+
+        row["seconds_old"], row["seconds_new"] = old["seconds_min"], new["seconds_min"]
+        row["time_ratio"] = new["seconds_min"] / old["seconds_min"] if old["seconds_min"] > 0 else 1.0
+        row["alloc_old_mb"], row["alloc_new_mb"] = old["alloc_peak_mb"], new["alloc_peak_mb"]
+        row["alloc_ratio"] = (new["alloc_peak_mb"] / old["alloc_peak_mb"]
+                              if old["alloc_peak_mb"] > 0 else 1.0)
+
+        time_delta = new["seconds_min"] - old["seconds_min"]
+        if row["time_ratio"] > 1 + threshold and time_delta > min_seconds:
+            row["reasons"].append(f"耗时 +{(row['time_ratio'] - 1) * 100:.0f}%")
+        if row["alloc_ratio"] > 1 + memory_threshold and new["alloc_peak_mb"] - old["alloc_peak_mb"] > 1:
+            row["reasons"].append(f"内存分配 +{(row['alloc_ratio'] - 1) * 100:.0f}%")
+
+        if row["reasons"]:
+            row["status"] = "regression"
+        elif row["time_ratio"] < 1 - threshold and -time_delta > min_seconds:
+            row["status"] = "improvement"
+        else:
+            row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def format_comparison(rows):
+    """把对比结果格式化为文本报告"""
+    lines = []
+    titles = [("regression", "性能回退"), ("error", "新增错误"), ("improvement", "性能提升")]
+    for status, title in titles:
+        selected = [row for row in rows if row["status"] == status]
+        if not selected:
+            continue
+        lines.append(f"== {title}（{len(selected)} 项）==")
+        for row in selected:
+            label = f"{row['function']:40s} {row['image']:>12s} {row['megapixels']:>5.1f} MP"
+            if "seconds_old" in row:
+                label += (f"  {row['seconds_old'] * 1000:9.1f} ms -> {row['seconds_new'] * 1000:9.1f} ms"
+                          f"  ({row['time_ratio']:.2f}x)")
+            if row["reasons"]:
+                label += "  " + "；".join(reason.strip().splitlines()[0] for reason in row["reasons"])
+            lines.append(label)
+        lines.append("")
+    counts = {status: sum(1 for row in rows if row["status"] == status) for status in ("ok", "missing", "new")}
+    lines.append(f"共 {len(rows)} 项：无明显变化 {counts['ok']} 项，"
+                 f"仅在基线中 {counts['missing']} 项，仅在当前结果中 {counts['new']} 项")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lab_engine.benchmark",
+                                     description="实验室图像处理函数基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行基准测试并保存结果")
+    run_parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                            help="测试分辨率（百万像素，逗号分隔）")
+    run_parser.add_argument("--images", default=SYNTHETIC,
+                            help=f"测试图像，逗号分隔：{SYNTHETIC}、examples 中的文件名，或 examples 表示全部素材")
+    run_parser.add_argument("--functions", default="", help="函数名通配符，逗号分隔（默认全部）")
+    run_parser.add_argument("--repeat", type=int, default=3, help="每项最多重复计时次数")
+    run_parser.add_argument("--budget", type=float, default=5.0, help="每项累计计时超过该秒数后不再重复")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="结果 JSON 路径")
+
+    compare_parser = subparsers.add_parser("compare", help="与基线对比并标记性能回退")
+    compare_parser.add_argument("baseline", help="基线 JSON")
+    compare_parser.add_argument("current", help="当前结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="耗时回退阈值（比例）")
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.2, help="内存分配回退阈值（比例）")
+    filters_parser = subparsers.add_parser("filters", help="在各风格上对比保边滤波后端的耗时和画质")
+    filters_parser.add_argument("--sizes", default="2", help="测试分辨率（百万像素，逗号分隔）")
+    filters_parser.add_argument("--images", default=SYNTHETIC, help="测试图像，同 run 子命令")
+    filters_parser.add_argument("--backends", default=",".join(BACKENDS), help="参与对比的后端，逗号分隔")
+    filters_parser.add_argument("--repeat", type=int, default=3, help="每项最多重复计时次数")
+    filters_parser.add_argument("--budget", type=float, default=5.0, help="每项累计计时超过该秒数后不再重复")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        rows = compare_results(baseline, current, args.threshold, args.memory_threshold)
+        print(format_comparison(rows))
+        return 1 if any(row["status"] in ("regression", "error") for row in rows) else 0
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    sizes = [float(size) for size in args.sizes.split(",") if size.strip()]
+    images = []
+    for item in filter(None, (item.strip() for item in args.images.split(","))):
+        images.extend(example_names() if item == "examples" else [item])
+
+    if args.command == "filters":
+        backends = [item.strip() for item in args.backends.split(",") if item.strip()]
+
+        def report_filter(row):
+            psnr = "参考" if row["backend"] == "bilateral" else f"{row['psnr']:6.1f} dB"
+            print(f"{row['function']:32s} {row['image']:>12s} {row['megapixels']:>5.1f} MP  "
+                  f"{row['backend']:>9s}  {row['seconds_min'] * 1000:9.1f} ms  PSNR {psnr}")
+
+        compare_filter_backends(sizes, images, backends, args.repeat, args.budget, on_result=report_filter)
+        return 0
+
+    patterns = [item.strip() for item in args.functions.split(",") if item.strip()] or None
+
+    def report(entry):
+        if entry["error"]:
+            message = entry["error"].strip().splitlines()[0]
+            print(f"{entry['function']:40s} {entry['image']:>12s} {entry['megapixels']:>5.1f} MP  {message}")
+        else:
+            growth = entry["rss_growth_mb"]
+            growth = f"{growth:7.0f} MB" if growth is not None else "      - "
+            print(f"{entry['function']:40s} {entry['image']:>12s} {entry['megapixels']:>5.1f} MP"
+                  f"  {entry['seconds_min'] * 1000:9.1f} ms  RSS +{growth}  分配 {entry['alloc_peak_mb']:7.1f} MB")
+
+    result = run_benchmark(sizes, images, patterns, args.repeat, args.budget, on_result=report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+内容寻址的结果缓存
+
+缓存键由 (图像内容哈希, 算子, 规范化参数) 计算得到，同一张图像同一组参数
+无论来自哪一次 Streamlit 重跑、哪个会话，都会命中同一条缓存。
+缓存按最近最少使用（LRU）淘汰，并受总字节数和条目数双重限制。
+"""
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 进程内中间结果缓存（调色板、关键点、查找表等）的清空函数，基准测试计时前统一清空
+_content_cache_clearers = []
+
+
+def compute_image_hash(image):
+    """计算图像内容哈希（包含形状和数据类型）"""
+    array = np.ascontiguousarray(image)
+    digest = hashlib.sha256()
+    digest.update(f"{array.shape}|{array.dtype.str}|".encode("ascii"))
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+def make_cache_key(source_key, operator_name, params, version=1):
+    """由上游数据的键、算子名、版本号和规范化参数生成缓存键"""
+    payload = json.dumps(
+        [source_key, operator_name, version, params],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_nbytes(value):
+    """估算缓存值占用的内存（字节）"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        size = sys.getsizeof(value)
+        if not value:
+            return size
+        # 长列表（如特征点坐标）按首元素估算，避免逐项遍历
+        if len(value) > 64:
+            return size + len(value) * estimate_nbytes(value[0])
+        return size + sum(estimate_nbytes(item) for item in value)
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):  # pandas.DataFrame
+        return int(memory_usage(deep=True).sum())
+    return sys.getsizeof(value)
+
+
+def freeze_result(value, source=None):
+    """
+    把结果中的数组设为只读，防止调用方原地修改缓存内容
+
+    source 为算子的输入图像时，与它共享内存的结果数组（算子原样返回输入或输入的视图）
+    先复制再设为只读，调用方自己的图像保持可写。
+    """
+    if isinstance(value, np.ndarray):
+        if source is not None and source.flags.writeable and np.may_share_memory(value, source):
+            value = value.copy()
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            value[key] = freeze_result(item, source)
+    elif isinstance(value, list):
+        value[:64] = [freeze_result(item, source) for item in value[:64]]
+    elif isinstance(value, tuple):
+        items = [freeze_result(item, source) for item in value[:64]]
+        if any(new is not old for new, old in zip(items, value)):
+            items += value[64:]
+            value = type(value)(*items) if hasattr(value, "_fields") else type(value)(items)
+    return value
+
+
+class ResultCache:
+    """线程安全的 LRU 结果缓存，受内存预算约束"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_entries=256):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, nbytes=None):
+        """写入缓存，超出预算时淘汰最久未使用的条目；单个结果超过预算时不缓存"""
+        nbytes = estimate_nbytes(value) if nbytes is None else int(nbytes)
+        if nbytes > self.max_bytes or self.max_entries <= 0:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self._entries and (self.current_bytes > self.max_bytes
+                                     or len(self._entries) > self.max_entries):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def register_content_cache(clear):
+    """登记一个进程内中间结果缓存的清空函数（可用作装饰器），返回 clear 本身"""
+    _content_cache_clearers.append(clear)
+    return clear
+
+
+def clear_content_caches():
+    """清空全部登记的中间结果缓存（基准测试计时前调用，计时的是完整计算而不是缓存命中）"""
+    for clear in _content_cache_clearers:
+        clear()
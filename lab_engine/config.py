@@ -0,0 +1,67 @@
+"""
+图像处理实验室引擎配置
+
+所有配置项都可以通过环境变量覆盖，便于在服务器上按内存大小调整。
+"""
+import os
+
+
+def _env_int(name, default):
+    """读取整数型环境变量，格式错误时使用默认值"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# 进程内结果缓存的内存预算（MB）与最大条目数
+RESULT_CACHE_MB = _env_int("LAB_RESULT_CACHE_MB", 512)
+RESULT_CACHE_MAX_ENTRIES = _env_int("LAB_RESULT_CACHE_MAX_ENTRIES", 256)
+
+# 预览模式下代理图像的默认最长边（像素）
+PREVIEW_MAX_SIDE = _env_int("LAB_PREVIEW_MAX_SIDE", 1024)
+
+# 分块执行：图块边长、线程数（0 表示按 CPU 核数）、启用分块的最小像素数
+TILE_SIZE = _env_int("LAB_TILE_SIZE", 1024)
+TILE_WORKERS = _env_int("LAB_TILE_WORKERS", 0)
+TILE_MIN_PIXELS = _env_int("LAB_TILE_MIN_PIXELS", 2_000_000)
+
+# 批量处理的进程数（0 表示按 CPU 核数）
+BATCH_WORKERS = _env_int("LAB_BATCH_WORKERS", 0)
+
+# 性能分析：是否启用、滚动日志路径（为空时不写日志）、单个日志文件大小（MB）和保留的备份数
+PROFILING = _env_int("LAB_PROFILING", 1)
+PROFILE_LOG = os.environ.get("LAB_PROFILE_LOG", "lab_profile.log")
+PROFILE_LOG_MB = _env_int("LAB_PROFILE_LOG_MB", 10)
+PROFILE_LOG_BACKUPS = _env_int("LAB_PROFILE_LOG_BACKUPS", 3)
+
+# 调色板量化：按 (图像, 颜色数) 缓存的调色板条目数
+PALETTE_CACHE_ENTRIES = _env_int("LAB_PALETTE_CACHE_ENTRIES", 64)
+
+# 多分辨率执行：粗层边长占原图的百分比（100 表示关闭）、启用降采样的最小像素数
+MULTIRES_QUALITY = _env_int("LAB_MULTIRES_QUALITY", 50)
+MULTIRES_MIN_PIXELS = _env_int("LAB_MULTIRES_MIN_PIXELS", 2_000_000)
+
+# 保边平滑滤波后端：bilateral（默认）、guided、dt、fgs，后三者需要 opencv-contrib 的 ximgproc 模块
+EDGE_FILTER_BACKEND = os.environ.get("LAB_EDGE_FILTER", "bilateral")
+
+# 磁盘结果缓存：目录（为空时关闭）与总大小上限（MB），只持久化素材库图像的结果
+DISK_CACHE_DIR = os.environ.get("LAB_DISK_CACHE_DIR", ".lab_cache")
+DISK_CACHE_MB = _env_int("LAB_DISK_CACHE_MB", 2048)
+
+# 上传图像解码缓存：内存预算（MB）与最大条目数；页面显示原图时使用的预览最长边（Streamlit 最大内容宽度）
+DECODE_CACHE_MB = _env_int("LAB_DECODE_CACHE_MB", 512)
+DECODE_CACHE_ENTRIES = _env_int("LAB_DECODE_CACHE_ENTRIES", 32)
+DISPLAY_MAX_SIDE = _env_int("LAB_DISPLAY_MAX_SIDE", 1460)
+
+# 素材库像素存储：目录（解码后的 .npy 像素文件和缩略图）与缩略图最长边
+EXAMPLE_STORE_DIR = os.environ.get("LAB_EXAMPLE_STORE_DIR", ".lab_examples")
+EXAMPLE_THUMB_SIDE = _env_int("LAB_EXAMPLE_THUMB_SIDE", 160)
+
+# 会话图像存储：全部会话合计的内存上限（MB）与单个会话的内存预算（MB）
+IMAGE_STORE_MB = _env_int("LAB_IMAGE_STORE_MB", 1024)
+IMAGE_SESSION_MB = _env_int("LAB_IMAGE_SESSION_MB", 256)
+
+# 关键点缓存：SIFT/ORB 关键点与描述子的内存预算（MB）与最大条目数
+KEYPOINT_CACHE_MB = _env_int("LAB_KEYPOINT_CACHE_MB", 128)
+KEYPOINT_CACHE_ENTRIES = _env_int("LAB_KEYPOINT_CACHE_ENTRIES", 64)
@@ -0,0 +1,138 @@
+"""
+上传图像的解码缓存
+
+Streamlit 每次重跑都会重新执行页面，各选项卡都要把上传文件重新读取、解码（Image.open → np.array）
+并转换颜色，一张 15 MB 的 JPEG 每次重跑要花几百毫秒。这里按上传文件内容的哈希缓存解码结果：
+- 文件内容不变时直接返回缓存的只读数组，重跑只剩读取字节和计算哈希；
+- 缓存受字节预算约束（LAB_DECODE_CACHE_MB），按最近最少使用淘汰；
+- 只需要预览尺寸（如页面显示原图）时走快速路径：JPEG 用 PIL 的 draft() 在 DCT 域按 1/2、1/4、1/8 缩小解码，
+  其他格式用 cv2.IMREAD_REDUCED_COLOR_2/4/8，不必先解码整幅大图。
+全分辨率解码与页面原来的方式完全一致（PIL 解码），处理结果和结果缓存的键都不受影响。
+"""
+import hashlib
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from . import config
+from .cache import ResultCache, freeze_result, register_content_cache
+from .profiling import profile_stage
+
+# 缩小解码支持的倍数（JPEG DCT 缩放和 IMREAD_REDUCED_* 都只支持这几档）
+REDUCE_FACTORS = (8, 4, 2)
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_decode_cache = ResultCache(max_bytes=config.DECODE_CACHE_MB * 1024 * 1024,
+                            max_entries=config.DECODE_CACHE_ENTRIES)
+
+
+def read_upload_bytes(uploaded_file):
+    """读取上传文件的全部字节（Streamlit 上传文件用 getvalue()，不受读取位置影响）"""
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    if hasattr(uploaded_file, "read"):
+        return uploaded_file.read()
+    with open(uploaded_file, "rb") as f:
+        return f.read()
+
+
+def upload_hash(data):
+    """上传文件内容的哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def reduce_factor(width, height, max_side):
+    """最长边不小于 max_side 的前提下可用的最大缩小倍数（1、2、4、8）"""
+    longest = max(width, height)
+    for factor in REDUCE_FACTORS:
+        if longest // factor >= max_side:
+            return factor
+    return 1
+
+
+def decode_reduced(data, max_side):
+    """
+    按预览尺寸快速解码，返回最长边不小于 max_side（图像本身更小时为原尺寸）的图像
+
+    JPEG 用 PIL draft() 在解码时按 DCT 缩放；其他格式用 cv2.IMREAD_REDUCED_COLOR_*。
+    返回数组的模式与 np.array(Image.open(...)) 相同。
+    """
+    pil_image = Image.open(io.BytesIO(data))
+    width, height = pil_image.size
+    factor = reduce_factor(width, height, max_side)
+    if factor == 1:
+        return np.array(pil_image)
+    if pil_image.format == "JPEG":
+        pil_image.draft(pil_image.mode, (width // factor, height // factor))
+        return np.array(pil_image)
+    if pil_image.mode != "RGB":
+        # 灰度、带透明通道等模式保持原样解码后再缩小
+        image = np.array(pil_image)
+        size = (max(1, width // factor), max(1, height // factor))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), _REDUCED_FLAGS[factor])
+    with profile_stage("颜色转换"):
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def _to_bgr(image):
+    with profile_stage("颜色转换"):
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+def decode_image_bytes(data, mode=None):
+    """
+    按页面的方式解码完整图像：np.array(Image.open(...))，mode 不为 None 时先转换模式
+
+    返回: (RGB 图像, BGR 图像)；灰度图像时 BGR 为三通道
+    """
+    pil_image = Image.open(io.BytesIO(data))
+    if mode is not None and pil_image.mode != mode:
+        pil_image = pil_image.convert(mode)
+    image = np.array(pil_image)
+    return image, _to_bgr(image)
+
+
+def decode_upload(uploaded_file, mode=None, max_side=None):
+    """
+    解码上传的图像（按内容哈希缓存）
+
+    参数:
+    - uploaded_file: Streamlit 上传文件、带 read() 的文件对象或文件路径
+    - mode: None 表示保持文件原有模式（与 np.array(Image.open(...)) 相同），"L" 表示转换为灰度
+    - max_side: 只需要预览尺寸时指定，按 1/2、1/4、1/8 缩小解码，最长边不小于 max_side（仅 mode 为 None 时有效）
+
+    返回: (RGB 图像, BGR 图像)，均为只读数组；灰度图像时 BGR 为三通道
+    """
+    data = read_upload_bytes(uploaded_file)
+    max_side = int(max_side) if max_side and mode is None else None
+    key = (upload_hash(data), mode, max_side)
+    decoded = _decode_cache.get(key)
+    if decoded is None:
+        if max_side:
+            image = decode_reduced(data, max_side)
+            decoded = image, _to_bgr(image)
+        else:
+            decoded = decode_image_bytes(data, mode)
+        decoded = freeze_result(decoded)
+        _decode_cache.put(key, decoded)
+    return decoded
+
+
+def decode_cache_stats():
+    """解码缓存统计信息"""
+    return _decode_cache.stats()
+
+
+@register_content_cache
+def clear_decode_cache():
+    """清空解码缓存"""
+    _decode_cache.clear()
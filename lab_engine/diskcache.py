@@ -0,0 +1,423 @@
+"""
+跨会话、跨进程的磁盘结果缓存
+
+学生大多从 examples/ 素材库的同一批图像出发、使用默认参数，同样的 Canny、CLAHE、动漫风格结果
+会被反复计算。这里把素材库图像的算子结果按内容寻址写入磁盘目录，服务重启或多个进程之间共享：
+- 文件名由流水线缓存键（源图像哈希、算子、规范化参数、算子版本号）与配置指纹共同决定，
+  配置指纹包含保边滤波后端、多分辨率阈值和 OpenCV 版本，切换实现后不会读到旧结果；
+- 数组结果保存为压缩的 .npz，读取时只用 NumPy，命中时不调用任何 OpenCV 处理；
+  特征点、表格等其他结果保存为压缩的 pickle；
+- 目录总大小受 LAB_DISK_CACHE_MB 限制，按文件修改时间做 LRU 淘汰（命中时刷新修改时间）；
+  内存索引未命中时直接检查磁盘，淘汰前重新扫描目录，其他进程（包括预热命令）写入的文件同样可见；
+- 只持久化来源于素材库的结果（源图像哈希登记在 sources.txt 中），学生上传的图像不落盘。
+写盘在后台线程中进行，不阻塞页面。
+
+命令行用法:
+    python -m lab_engine.diskcache warm                       # 预先计算素材库 × 全部算子的默认参数结果
+    python -m lab_engine.diskcache warm --operators "canny,clahe,*_style" --examples "风景*"
+    python -m lab_engine.diskcache stats
+    python -m lab_engine.diskcache clear
+"""
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from . import config
+from .cache import ResultCache, compute_image_hash, freeze_result
+
+# 磁盘格式版本，格式变化时递增，旧文件自动失效
+DISK_FORMAT = 1
+SOURCES_FILE = "sources.txt"
+ARRAY_SUFFIX = ".npz"
+PICKLE_SUFFIX = ".pkl"
+
+
+def cache_fingerprint():
+    """影响算子输出但不在参数中的配置，参与磁盘缓存键的计算"""
+    return json.dumps({
+        "format": DISK_FORMAT,
+        "opencv": cv2.__version__,
+        "edge_filter": config.EDGE_FILTER_BACKEND,
+        "multires_min_pixels": config.MULTIRES_MIN_PIXELS,
+    }, sort_keys=True)
+
+
+def _array_parts(value):
+    """结果为数组或数组组成的列表/元组时返回 (类型, 数组列表)，否则返回 None"""
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return "array", [value]
+    if isinstance(value, (list, tuple)) and value and all(
+            isinstance(item, np.ndarray) and item.dtype != object for item in value):
+        return type(value).__name__, list(value)
+    return None
+
+
+class DiskCache:
+    """按内容寻址、大小受限的磁盘 LRU 缓存"""
+
+    def __init__(self, root, max_bytes=2048 * 1024 * 1024, fingerprint=None):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.fingerprint = cache_fingerprint() if fingerprint is None else fingerprint
+        self._lock = threading.Lock()
+        self._index = None
+        self._sources = None
+        self._writer = None
+        self._pending = set()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # 目录与索引
+    # ------------------------------------------------------------------
+    def _name(self, key):
+        return hashlib.sha256(f"{self.fingerprint}|{key}".encode("utf-8")).hexdigest()
+
+    def _path(self, name, suffix):
+        return os.path.join(self.root, name[:2], name + suffix)
+
+    def _scan(self):
+        """扫描目录，返回 (文件名 -> [路径, 大小, 修改时间], 总大小)；不需要持有锁"""
+        index = {}
+        total = 0
+        if not os.path.isdir(self.root):
+            return index, total
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                name, suffix = os.path.splitext(entry.name)
+                if suffix not in (ARRAY_SUFFIX, PICKLE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # 扫描期间被其他进程淘汰
+                    continue
+                index[name] = [entry.path, stat.st_size, stat.st_mtime]
+                total += stat.st_size
+        return index, total
+
+    def _load_index(self):
+        """首次使用时扫描目录（调用方持有锁）"""
+        if self._index is None:
+            self._index, self.current_bytes = self._scan()
+        return self._index
+
+    def _lookup(self, name):
+        """
+        查找索引项（调用方持有锁）
+
+        内存索引只在首次使用时扫描目录，未命中时再检查磁盘上的两种文件，
+        其他进程写入的结果被登记到索引中。
+        """
+        index = self._load_index()
+        entry = index.get(name)
+        if entry is not None:
+            return entry
+        for suffix in (ARRAY_SUFFIX, PICKLE_SUFFIX):
+            path = self._path(name, suffix)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = index[name] = [path, stat.st_size, stat.st_mtime]
+            self.current_bytes += stat.st_size
+            return entry
+        return None
+
+    def _load_sources(self):
+        if self._sources is None:
+            path = os.path.join(self.root, SOURCES_FILE)
+            try:
+                with open(path, encoding="ascii") as f:
+                    self._sources = {line.strip() for line in f if line.strip()}
+            except OSError:
+                self._sources = set()
+        return self._sources
+
+    def accepts(self, source_key):
+        """源图像是否登记为素材库图像（只有这些图像的结果会持久化）"""
+        if source_key is None:
+            return False
+        with self._lock:
+            return source_key in self._load_sources()
+
+    def add_sources(self, source_keys):
+        """登记素材库图像的内容哈希，写入 sources.txt 供其他进程读取"""
+        with self._lock:
+            sources = self._load_sources()
+            new = [key for key in source_keys if key not in sources]
+            if not new:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, SOURCES_FILE), "a", encoding="ascii") as f:
+                f.writelines(key + "\n" for key in new)
+            sources.update(new)
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+    def get(self, key, default=None):
+        name = self._name(key)
+        with self._lock:
+            entry = self._lookup(name)
+            if entry is None:
+                self.misses += 1
+                return default
+            path = entry[0]
+        try:
+            if path.endswith(ARRAY_SUFFIX):
+                with np.load(path, allow_pickle=False) as data:
+                    kind = str(data["kind"])
+                    arrays = [data[f"a{index}"] for index in range(int(data["count"]))]
+                value = arrays[0] if kind == "array" else (tuple(arrays) if kind == "tuple" else arrays)
+            else:
+                with open(path, "rb") as f:
+                    value = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, ValueError, KeyError, EOFError, zlib.error, pickle.UnpicklingError):
+            # 文件被其他进程淘汰或写坏时按未命中处理
+            with self._lock:
+                self._forget(name)
+                self.misses += 1
+            return default
+        with self._lock:
+            entry[2] = time.time()
+            self.hits += 1
+        return freeze_result(value)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(self._name(key)) is not None
+
+    def _forget(self, name):
+        entry = self._index.pop(name, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+    def _serialize(self, value):
+        parts = _array_parts(value)
+        if parts is not None:
+            kind, arrays = parts
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, kind=np.array(kind), count=np.array(len(arrays)),
+                                **{f"a{index}": array for index, array in enumerate(arrays)})
+            return buffer.getvalue(), ARRAY_SUFFIX
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6), PICKLE_SUFFIX
+
+    def _write(self, name, value):
+        data, suffix = self._serialize(value)
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(name, suffix)
+        # 先写临时文件再原子替换，其他进程不会读到写了一半的文件
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        except OSError:
+            # 磁盘已满或目录不可写时放弃本次写入，不影响页面
+            if os.path.exists(temp):
+                os.remove(temp)
+            return
+        # 其他进程也在向目录写入，淘汰前重新扫描得到实际的文件和总大小（扫描不持有锁）
+        index, total = self._scan()
+        with self._lock:
+            self._index, self.current_bytes = index, total
+            self.writes += 1
+            self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的文件直到总大小不超过预算（调用方持有锁）"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        for name, (path, _, _) in sorted(self._index.items(), key=lambda item: item[1][2]):
+            if self.current_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._forget(name)
+            self.evictions += 1
+
+    def put(self, key, value):
+        """在后台线程中把结果写入磁盘；已存在的键不重复写入"""
+        name = self._name(key)
+        with self._lock:
+            if name in self._pending or self._lookup(name) is not None:
+                return False
+            self._pending.add(name)
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lab-disk-cache")
+            future = self._writer.submit(self._write, name, value)
+        future.add_done_callback(lambda _: self._done(name))
+        return True
+
+    def _done(self, name):
+        with self._lock:
+            self._pending.discard(name)
+
+    def flush(self):
+        """等待后台写盘全部完成"""
+        with self._lock:
+            writer = self._writer
+        if writer is not None:
+            writer.submit(lambda: None).result()
+
+    def clear(self):
+        """删除全部缓存文件（保留素材库登记）"""
+        self.flush()
+        with self._lock:
+            for path, _, _ in self._load_index().values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index = {}
+            self.current_bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_index())
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            self._load_index()
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "sources": len(self._load_sources()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def open_disk_cache(root=None, max_mb=None):
+    """按配置创建磁盘缓存；LAB_DISK_CACHE_DIR 为空时返回 None（关闭磁盘缓存）"""
+    root = config.DISK_CACHE_DIR if root is None else root
+    if not root:
+        return None
+    max_mb = config.DISK_CACHE_MB if max_mb is None else max_mb
+    return DiskCache(root, max_mb * 1024 * 1024)
+
+
+# ----------------------------------------------------------------------
+# 预热
+# ----------------------------------------------------------------------
+def warm_examples(disk_cache, operators=None, examples=None, on_result=None, page_path=None):
+    """
+    预先计算素材库图像 × 算子的默认参数结果并写入磁盘缓存
+
+    参数:
+    - operators, examples: 算子名、素材文件名的通配符列表，None 表示全部
+    - on_result: 每完成一项调用一次 on_result(素材, 算子, 秒数, 错误信息)
+
+    返回: (新计算的项数, 已缓存跳过的项数, 失败的项数)
+    """
+    from .benchmark import EXAMPLES_DIR, example_names
+    from .lab_operators import build_lab_registry
+    from .loader import load_lab_namespace
+    from .pipeline import PipelineExecutor
+
+    namespace = load_lab_namespace(page_path)
+    registry = build_lab_registry(namespace)
+    # 内存缓存容量为 0：结果只写磁盘，不在本进程中常驻
+    executor = PipelineExecutor(registry, ResultCache(max_bytes=0, max_entries=0), disk_cache)
+    names = [operator.name for operator in registry
+             if not operators or any(fnmatch.fnmatch(operator.name, pattern) for pattern in operators)]
+    files = [name for name in example_names()
+             if not examples or any(fnmatch.fnmatch(name, pattern) for pattern in examples)]
+
+    computed = skipped = failed = 0
+    for filename in files:
+        # 与页面完全相同的解码方式，保证源图像哈希一致
+        _, image = namespace["decode_uploaded_image"](os.path.join(EXAMPLES_DIR, filename))
+        image_key = compute_image_hash(image)
+        disk_cache.add_sources([image_key])
+        for name in names:
+            if executor.step_key(image_key, name, registry.canonical_params(name)) in disk_cache:
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            error = None
+            try:
+                executor.run_operator(image, name, image_key=image_key)
+                computed += 1
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                failed += 1
+            if on_result is not None:
+                on_result(filename, name, time.perf_counter() - start, error)
+        disk_cache.flush()
+    return computed, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lab_engine.diskcache", description="实验室磁盘结果缓存")
+    parser.add_argument("--dir", default=None, help="缓存目录（默认取配置 LAB_DISK_CACHE_DIR）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm_parser = subparsers.add_parser("warm", help="预先计算素材库图像的默认参数结果")
+    warm_parser.add_argument("--operators", default="", help="算子名通配符，逗号分隔（默认全部）")
+    warm_parser.add_argument("--examples", default="", help="素材文件名通配符，逗号分隔（默认全部）")
+    subparsers.add_parser("stats", help="显示缓存统计")
+    subparsers.add_parser("clear", help="删除全部缓存文件")
+    args = parser.parse_args(argv)
+
+    disk_cache = open_disk_cache(args.dir)
+    if disk_cache is None:
+        print("磁盘缓存未启用（LAB_DISK_CACHE_DIR 为空）")
+        return 1
+
+    if args.command == "stats":
+        stats = disk_cache.stats()
+        print(f"{disk_cache.root}: {stats['entries']} 项，{stats['bytes'] / 2 ** 20:.1f} / "
+              f"{stats['max_bytes'] / 2 ** 20:.0f} MB，登记素材 {stats['sources']} 张")
+        return 0
+    if args.command == "clear":
+        disk_cache.clear()
+        print(f"已清空 {disk_cache.root}")
+        return 0
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    operators = [item.strip() for item in args.operators.split(",") if item.strip()] or None
+    examples = [item.strip() for item in args.examples.split(",") if item.strip()] or None
+
+    def report(filename, name, seconds, error):
+        status = error.strip().splitlines()[0] if error else f"{seconds * 1000:9.1f} ms"
+        print(f"{filename:32s} {name:32s} {status}")
+
+    computed, skipped, failed = warm_examples(disk_cache, operators, examples, on_result=report)
+    stats = disk_cache.stats()
+    print(f"新计算 {computed} 项，已缓存 {skipped} 项，失败 {failed} 项；"
+          f"缓存共 {stats['entries']} 项，{stats['bytes'] / 2 ** 20:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+可替换的保边平滑滤波后端
+
+实验室中的绘画、风格函数大量使用 cv2.bilateralFilter(d=7~15)，其耗时随核直径增长。
+edge_preserving_filter 保持双边滤波的参数形式 (d, sigmaColor, sigmaSpace)，
+按配置 LAB_EDGE_FILTER 切换到每像素 O(1) 的替代实现（opencv-contrib 的 ximgproc 模块）：
+- bilateral: cv2.bilateralFilter（默认，大图分块并行）
+- guided: 引导滤波 guidedFilter，以图像自身为引导
+- dt: 域变换滤波 dtFilter（归一化卷积模式）
+- fgs: 快速全局平滑 fastGlobalSmootherFilter
+各后端的参数换算在示例素材上按与双边滤波结果的 PSNR 标定；
+不同后端在各风格上的耗时与画质可用 python -m lab_engine.benchmark filters 对比。
+"""
+import cv2
+
+from . import config
+from .tiling import run_tiled
+
+BACKENDS = ("bilateral", "guided", "dt", "fgs")
+
+
+def _bilateral(image, d, sigma_color, sigma_space):
+    return run_tiled(lambda tile: cv2.bilateralFilter(tile, d, sigma_color, sigma_space), image, halo=d // 2)
+
+
+def _guided(image, d, sigma_color, sigma_space):
+    return cv2.ximgproc.guidedFilter(image, image, max(1, d // 2), (0.35 * sigma_color) ** 2)
+
+
+def _domain_transform(image, d, sigma_color, sigma_space):
+    return cv2.ximgproc.dtFilter(image, image, d / 4, 2 * sigma_color, mode=cv2.ximgproc.DTF_NC, numIters=3)
+
+
+def _global_smoother(image, d, sigma_color, sigma_space):
+    return cv2.ximgproc.fastGlobalSmootherFilter(image, image, (0.35 * d) ** 2, 0.2 * sigma_color)
+
+
+_FILTERS = {
+    "bilateral": _bilateral,
+    "guided": _guided,
+    "dt": _domain_transform,
+    "fgs": _global_smoother,
+}
+
+
+def resolve_backend(backend=None):
+    """规范化后端名称；ximgproc 不可用时退回双边滤波"""
+    backend = (backend or config.EDGE_FILTER_BACKEND or "bilateral").lower()
+    if backend not in _FILTERS:
+        raise ValueError(f"未知的保边滤波后端: {backend}，可选 {', '.join(BACKENDS)}")
+    if backend != "bilateral" and not hasattr(cv2, "ximgproc"):
+        return "bilateral"
+    return backend
+
+
+def edge_preserving_filter(image, d, sigma_color, sigma_space=None, backend=None):
+    """
+    保边平滑
+
+    参数:
+    - image: uint8 图像（灰度或 BGR）
+    - d, sigma_color, sigma_space: 与 cv2.bilateralFilter 相同，sigma_space 默认等于 sigma_color
+    - backend: 后端名称，None 时使用配置 LAB_EDGE_FILTER
+
+    返回: 与输入同尺寸的平滑结果
+    """
+    sigma_space = sigma_color if sigma_space is None else sigma_space
+    return _FILTERS[resolve_backend(backend)](image, int(d), float(sigma_color), float(sigma_space))
@@ -0,0 +1,321 @@
+"""
+素材库索引与像素存储
+
+13 个选项卡每次重跑都要列出 examples/ 目录，选中素材后还要整张读取文件、计算哈希并解码。
+这里把素材库建成一个进程内共享的索引：
+- 目录只在修改时间变化时重新扫描，单个文件按 (修改时间, 大小) 判断是否需要重建；
+- 解码后的像素保存为 .npy 文件，之后用 np.load(mmap_mode="r") 以内存映射方式打开，
+  所有会话、所有选项卡拿到的都是同一份只读视图，多个服务进程共享操作系统的页缓存；
+- 同时保存页面显示用的预览图（最长边 LAB_DISPLAY_MAX_SIDE）和缩略图 JPEG（最长边 LAB_EXAMPLE_THUMB_SIDE），
+  缩略图画廊只向浏览器发送小图；
+- 全分辨率像素由 decode_image_bytes 解码，与页面解码上传文件的方式完全相同，
+  源图像哈希与磁盘结果缓存中的键一致。
+
+命令行用法:
+    python -m lab_engine.examples build      # 预先生成全部素材的像素文件和缩略图
+    python -m lab_engine.examples stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+from . import config
+from .cache import compute_image_hash
+from .decoding import decode_image_bytes, decode_reduced
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tiff')
+# 存储格式版本，格式变化时递增，旧文件自动失效
+STORE_FORMAT = 1
+# 每张素材保存的文件：全分辨率 RGB/BGR、显示预览（.npy）、缩略图（.jpg）和元数据（.json）
+_ARRAY_PARTS = ("rgb", "bgr", "display")
+
+
+class ExampleImage:
+    """素材库中的一张图像，接口与 Streamlit 上传文件相同（name、read()、getvalue()）"""
+
+    def __init__(self, library, name):
+        self.library = library
+        self.name = name
+        self.path = os.path.join(library.root, name)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    getvalue = read
+
+    def arrays(self):
+        """(RGB 图像, BGR 图像)，只读的内存映射视图"""
+        return self.library.arrays(self.name)
+
+    def display(self):
+        """页面显示用的预览图像"""
+        return self.library.display(self.name)
+
+    def image_key(self):
+        """BGR 图像的内容哈希（与 compute_image_hash 相同）"""
+        return self.library.image_key(self.name)
+
+
+class ExampleLibrary:
+    """按修改时间失效的素材库索引，像素以内存映射的 .npy 文件保存"""
+
+    def __init__(self, root=EXAMPLES_DIR, store_dir=None, display_side=None, thumb_side=None):
+        self.root = root
+        self.store_dir = config.EXAMPLE_STORE_DIR if store_dir is None else store_dir
+        self.display_side = config.DISPLAY_MAX_SIDE if display_side is None else int(display_side)
+        self.thumb_side = config.EXAMPLE_THUMB_SIDE if thumb_side is None else int(thumb_side)
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._entries = {}
+        self._names = []
+        # 文件名 -> 已打开的内存映射、缩略图字节和元数据，按存储前缀区分版本
+        self._loaded = {}
+        self.scans = 0
+        self.builds = 0
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+    def _scan(self):
+        """目录修改时间变化时重新列出素材（调用方持有锁）"""
+        try:
+            mtime = os.stat(self.root).st_mtime_ns
+        except OSError:
+            self._dir_mtime, self._entries, self._names = None, {}, []
+            return
+        if mtime == self._dir_mtime:
+            return
+        entries = {}
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                stat = entry.stat()
+                entries[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        self._dir_mtime = mtime
+        self._entries = entries
+        self._names = sorted(entries)
+        self.scans += 1
+        for name in list(self._loaded):
+            if name not in entries:
+                del self._loaded[name]
+
+    def names(self):
+        """素材文件名列表（按名称排序）"""
+        with self._lock:
+            self._scan()
+            return list(self._names)
+
+    def __contains__(self, name):
+        with self._lock:
+            self._scan()
+            return name in self._entries
+
+    def __len__(self):
+        return len(self.names())
+
+    def open(self, name):
+        """返回类似上传文件的素材对象"""
+        if name not in self:
+            raise KeyError(name)
+        return ExampleImage(self, name)
+
+    def _prefix(self, name):
+        """存储文件名前缀：由素材名、修改时间、大小和显示尺寸决定，文件被替换后自动换用新前缀"""
+        with self._lock:
+            self._scan()
+            stamp = self._entries.get(name)
+        if stamp is None:
+            raise KeyError(name)
+        # 原地覆盖文件不会改变目录修改时间，每次取用时重新检查文件本身
+        try:
+            stat = os.stat(os.path.join(self.root, name))
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            raise KeyError(name)
+        payload = f"{STORE_FORMAT}|{name}|{stamp[0]}|{stamp[1]}|{self.display_side}|{self.thumb_side}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+    def _path(self, prefix, part):
+        suffix = {"thumb": ".jpg", "meta": ".json"}.get(part, ".npy")
+        return os.path.join(self.store_dir, f"{prefix}.{part}{suffix}")
+
+    # ------------------------------------------------------------------
+    # 像素存储
+    # ------------------------------------------------------------------
+    def _write_file(self, path, write):
+        """先写临时文件再原子替换，其他进程不会读到写了一半的文件"""
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                write(f)
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def _build(self, name, prefix):
+        """解码素材并写入像素文件、缩略图和元数据"""
+        with open(os.path.join(self.root, name), "rb") as f:
+            data = f.read()
+        image_rgb, image_bgr = decode_image_bytes(data)
+        display = decode_reduced(data, self.display_side)
+        thumb = cv2.resize(image_bgr, _fit_size(image_bgr.shape, self.thumb_side), interpolation=cv2.INTER_AREA)
+        ok, thumb_jpeg = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            raise ValueError(f"无法生成缩略图: {name}")
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        for part, array in zip(_ARRAY_PARTS, (image_rgb, image_bgr, display)):
+            self._write_file(self._path(prefix, part), lambda f, array=array: np.save(f, array))
+        self._write_file(self._path(prefix, "thumb"), lambda f: f.write(thumb_jpeg.tobytes()))
+        meta = {
+            "name": name,
+            "width": int(image_rgb.shape[1]),
+            "height": int(image_rgb.shape[0]),
+            "channels": 1 if image_rgb.ndim == 2 else int(image_rgb.shape[2]),
+            "image_key": compute_image_hash(image_bgr),
+        }
+        # 元数据最后写入，存在即表示其他文件已完整
+        self._write_file(self._path(prefix, "meta"), lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+        self.builds += 1
+        self._remove_stale(name, prefix)
+        return meta
+
+    def _remove_stale(self, name, prefix):
+        """删除同一素材旧版本的存储文件"""
+        for entry in os.scandir(self.store_dir):
+            if not entry.name.endswith(".meta.json") or entry.name.startswith(prefix):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    stale = json.load(f).get("name") == name
+            except (OSError, ValueError):
+                continue
+            if stale:
+                old_prefix = entry.name[:-len(".meta.json")]
+                for part in _ARRAY_PARTS + ("thumb", "meta"):
+                    try:
+                        os.remove(self._path(old_prefix, part))
+                    except OSError:
+                        pass
+
+    def _load(self, name):
+        """返回素材的已加载状态，存储文件缺失或过期时先重建"""
+        prefix = self._prefix(name)
+        loaded = self._loaded.get(name)
+        if loaded is not None and loaded["prefix"] == prefix:
+            return loaded
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded is not None and loaded["prefix"] == prefix:
+                return loaded
+            try:
+                with open(self._path(prefix, "meta"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = self._build(name, prefix)
+            loaded = {"prefix": prefix, "meta": meta}
+            self._loaded[name] = loaded
+            return loaded
+
+    def _array(self, name, part):
+        loaded = self._load(name)
+        array = loaded.get(part)
+        if array is None:
+            try:
+                # 转为普通 ndarray 视图（仍引用同一映射），下游代码不会拿到 np.memmap 子类
+                array = np.load(self._path(loaded["prefix"], part), mmap_mode="r").view(np.ndarray)
+            except (OSError, ValueError):
+                # 文件被其他进程删除时丢弃状态重建一次
+                with self._lock:
+                    self._loaded.pop(name, None)
+                    self._build(name, loaded["prefix"])
+                return self._array(name, part)
+            loaded[part] = array
+        return array
+
+    def arrays(self, name):
+        """(RGB 图像, BGR 图像)：只读内存映射，与 decode_image_bytes 的结果逐像素相同；灰度素材时 RGB 为二维"""
+        return self._array(name, "rgb"), self._array(name, "bgr")
+
+    def display(self, name):
+        """显示用的预览图像（最长边不小于 display_side，与 decode_reduced 相同）"""
+        return self._array(name, "display")
+
+    def thumbnail(self, name):
+        """缩略图的 JPEG 字节，可直接交给 st.image，不必每次重跑重新编码"""
+        loaded = self._load(name)
+        thumb = loaded.get("thumb")
+        if thumb is None:
+            with open(self._path(loaded["prefix"], "thumb"), "rb") as f:
+                thumb = loaded["thumb"] = f.read()
+        return thumb
+
+    def info(self, name):
+        """素材的尺寸、通道数和 BGR 内容哈希"""
+        return dict(self._load(name)["meta"])
+
+    def image_key(self, name):
+        return self._load(name)["meta"]["image_key"]
+
+    def build(self, on_result=None):
+        """预先生成全部素材的存储文件，返回新生成的数量"""
+        before = self.builds
+        for name in self.names():
+            self._load(name)
+            if on_result is not None:
+                on_result(name, self.info(name))
+        return self.builds - before
+
+    def stats(self):
+        """索引统计信息"""
+        names = self.names()
+        with self._lock:
+            return {
+                "examples": len(names),
+                "loaded": len(self._loaded),
+                "mapped_bytes": sum(array.nbytes for loaded in self._loaded.values()
+                                    for part, array in loaded.items() if part in _ARRAY_PARTS),
+                "scans": self.scans,
+                "builds": self.builds,
+            }
+
+
+def _fit_size(shape, max_side):
+    """最长边缩放到 max_side（不放大）时的 (宽, 高)"""
+    height, width = shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lab_engine.examples", description="素材库索引与像素存储")
+    parser.add_argument("--dir", default=None, help="存储目录（默认取配置 LAB_EXAMPLE_STORE_DIR）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="预先生成全部素材的像素文件和缩略图")
+    subparsers.add_parser("stats", help="显示素材库统计")
+    args = parser.parse_args(argv)
+
+    library = ExampleLibrary(store_dir=args.dir)
+    if args.command == "build":
+        def report(name, info):
+            print(f"{name:32s} {info['width']:6d} x {info['height']:<6d} {info['image_key'][:12]}")
+
+        built = library.build(on_result=report)
+        print(f"共 {len(library.names())} 张素材，新生成 {built} 张，存储目录 {library.store_dir}")
+        return 0
+
+    stats = library.stats()
+    print(f"{library.root}: {stats['examples']} 张素材，存储目录 {library.store_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
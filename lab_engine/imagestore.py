@@ -0,0 +1,214 @@
+"""
+会话图像存储
+
+页面在 session_state 中为每个选项卡保存整幅图像，老照片上色还同时保存 RGB 和 BGR 两份结果。
+学生在多个选项卡打开同一张 2000 万像素的图像时，每个会话要重复占用几百 MB，
+几十个会话同时在线时服务器内存不足。这里把图像数组集中保存在进程级存储中：
+- 数组按内容哈希只保存一份，多个会话、多个选项卡引用同一张图像时共用；
+- session_state 里只放轻量的 ImageHandle（哈希、形状、数据类型），按槽位（如 image_tab1）登记；
+- RGB 视图在第一次取用时才由 BGR 转换得到，与原图一起计入内存并一起淘汰；
+- 每个会话有内存预算（LAB_IMAGE_SESSION_MB），超出时按最近最少使用释放本会话的引用；
+  全部会话合计受 LAB_IMAGE_STORE_MB 限制，超出时淘汰全局最久未使用的图像；
+- 会话对象被回收（会话结束）时自动释放它的全部引用，没有会话引用的图像立即删除。
+图像被淘汰后 get() 返回 None，页面按未保存处理（提示重新上传或重新处理）。
+"""
+import threading
+import uuid
+import weakref
+from collections import OrderedDict, namedtuple
+
+import cv2
+
+from .cache import compute_image_hash, freeze_result
+from .profiling import profile_stage
+
+# session_state 中保存的图像句柄：内容哈希、形状、数据类型
+ImageHandle = namedtuple("ImageHandle", ["key", "shape", "dtype"])
+
+
+def _to_rgb(image):
+    with profile_stage("颜色转换"):
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+class SharedImageStore:
+    """进程级图像存储：按内容哈希去重，记录引用的会话，受全局内存上限约束"""
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        # 内容哈希 -> {"image", "rgb", "nbytes", "holders"}，按最近使用排序
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, session_id, image, key=None):
+        """保存 BGR（或灰度）图像并登记引用的会话，返回句柄；数组设为只读，内容相同的图像只保存一份"""
+        key = compute_image_hash(image) if key is None else key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"image": freeze_result(image), "rgb": None, "nbytes": image.nbytes, "holders": set()}
+                self._entries[key] = entry
+                self.current_bytes += image.nbytes
+            else:
+                self._entries.move_to_end(key)
+            entry["holders"].add(session_id)
+            self._evict()
+        return ImageHandle(key, tuple(image.shape), image.dtype.str)
+
+    def get(self, handle, rgb=False):
+        """按句柄取回图像；rgb=True 时返回（按需生成的）RGB 图像；已淘汰时返回 None"""
+        with self._lock:
+            entry = self._entries.get(handle.key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(handle.key)
+            self.hits += 1
+            image = entry["image"]
+            if not rgb:
+                return image
+            if entry["rgb"] is not None:
+                return entry["rgb"]
+        # 颜色转换不持有锁；并发时各自转换一次，结果相同
+        image_rgb = freeze_result(_to_rgb(image))
+        with self._lock:
+            entry = self._entries.get(handle.key)
+            if entry is not None and entry["rgb"] is None:
+                entry["rgb"] = image_rgb
+                entry["nbytes"] += image_rgb.nbytes
+                self.current_bytes += image_rgb.nbytes
+                self._evict()
+        return image_rgb
+
+    def nbytes(self, key):
+        """图像及其 RGB 视图占用的字节数；不存在时为 0"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["nbytes"] if entry is not None else 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def release(self, session_id, key):
+        """会话不再引用图像；没有会话引用时删除"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["holders"].discard(session_id)
+            if not entry["holders"]:
+                self._drop(key)
+
+    def release_session(self, session_id):
+        """释放会话的全部引用（会话结束时调用）"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if session_id in entry["holders"]]:
+                holders = self._entries[key]["holders"]
+                holders.discard(session_id)
+                if not holders:
+                    self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry["nbytes"]
+
+    def _evict(self):
+        """超出全局上限时淘汰最久未使用的图像（调用方持有锁）；刚写入的图像至少保留"""
+        while len(self._entries) > 1 and self.current_bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self):
+        """存储统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "sessions": len(set().union(*(entry["holders"] for entry in self._entries.values()))),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class SessionImages:
+    """
+    一个会话的图像视图：槽位 -> 句柄，超出会话预算时按最近最少使用释放引用
+
+    对象放在 st.session_state 中，会话结束被回收时自动释放全部引用。
+    """
+
+    def __init__(self, store, max_bytes=256 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = int(max_bytes)
+        self.session_id = uuid.uuid4().hex
+        self._slots = OrderedDict()
+        weakref.finalize(self, store.release_session, self.session_id)
+
+    def put(self, slot, image, key=None):
+        """把图像放入槽位，返回句柄；槽位原来的图像不再被其他槽位引用时释放"""
+        handle = self.store.put(self.session_id, image, key)
+        old = self._slots.pop(slot, None)
+        self._slots[slot] = handle
+        if old is not None and old.key != handle.key:
+            self._release_if_unused(old.key)
+        self._evict(keep=slot)
+        return handle
+
+    def handle(self, slot):
+        return self._slots.get(slot)
+
+    def get(self, slot, rgb=False):
+        """取回槽位中的图像（rgb=True 时为 RGB 视图）；槽位为空或图像已被淘汰时返回 None"""
+        handle = self._slots.get(slot)
+        if handle is None:
+            return None
+        image = self.store.get(handle, rgb=rgb)
+        if image is None:
+            del self._slots[slot]
+            return None
+        self._slots.move_to_end(slot)
+        if rgb:
+            self._evict(keep=slot)
+        return image
+
+    def rgb(self, slot):
+        return self.get(slot, rgb=True)
+
+    def discard(self, slot):
+        """清空槽位"""
+        handle = self._slots.pop(slot, None)
+        if handle is not None:
+            self._release_if_unused(handle.key)
+
+    def __contains__(self, slot):
+        return slot in self._slots
+
+    def _release_if_unused(self, key):
+        if all(handle.key != key for handle in self._slots.values()):
+            self.store.release(self.session_id, key)
+
+    def current_bytes(self):
+        """本会话引用的图像占用的字节数（同一图像只计一次）"""
+        return sum(self.store.nbytes(key) for key in {handle.key for handle in self._slots.values()})
+
+    def _evict(self, keep=None):
+        """超出会话预算时释放最久未使用的槽位，keep 槽位保留"""
+        while self.current_bytes() > self.max_bytes:
+            slot = next((slot for slot in self._slots if slot != keep), None)
+            if slot is None:
+                break
+            self.discard(slot)
@@ -0,0 +1,217 @@
+"""
+关键点与描述子缓存
+
+SIFT、ORB 每次点击都要新建检测器并在整幅灰度图上 detectAndCompute，页面用完即丢弃描述子：
+- 检测器对象按 (检测器, 参数) 放入对象池复用，并发调用时每个线程借用各自的实例；
+- 检测结果按 (灰度图内容哈希, 检测器, 参数) 缓存为 KeypointSet：坐标、尺度、角度等按列保存为数组，
+  描述子保存为紧凑数组（SIFT 描述子取值为 0~255 的整数，按 uint8 保存，只占 float32 的 1/4），
+  缓存受内存预算约束（LAB_KEYPOINT_CACHE_MB）；
+- 绘制、统计、匹配都直接使用缓存的数组，只改绘制样式时不会重新检测。
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from . import config
+from .cache import ResultCache, compute_image_hash, make_cache_key, register_content_cache
+
+DETECTORS = {
+    "sift": cv2.SIFT_create,
+    "orb": cv2.ORB_create,
+}
+
+# 关键点绘制样式
+DRAW_STYLES = {
+    "rich": cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS,
+    "points": cv2.DRAW_MATCHES_FLAGS_DEFAULT,
+}
+
+# 对象池最多保留的参数组数
+POOL_PARAM_SETS = 16
+
+_keypoint_cache = ResultCache(max_bytes=config.KEYPOINT_CACHE_MB * 1024 * 1024,
+                              max_entries=config.KEYPOINT_CACHE_ENTRIES)
+
+
+class KeypointSet:
+    """
+    按列保存的关键点和描述子
+
+    - points: (N, 2) float32，每行为 (x, y)
+    - sizes、angles、responses: (N,) float32
+    - octaves: (N,) int32
+    - descriptors: (N, D) 数组，ORB 为 uint8 二进制描述子，SIFT 为 uint8 压缩保存的浮点描述子
+    """
+
+    def __init__(self, detector, points, sizes, angles, responses, octaves, descriptors, float_descriptors):
+        self.detector = detector
+        self.points = points
+        self.sizes = sizes
+        self.angles = angles
+        self.responses = responses
+        self.octaves = octaves
+        self.descriptors = descriptors
+        self.float_descriptors = float_descriptors
+        for array in (points, sizes, angles, responses, octaves, descriptors):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_opencv(cls, detector, keypoints, descriptors):
+        count = len(keypoints)
+        dimension = 0 if descriptors is None else descriptors.shape[1]
+        float_descriptors = descriptors is not None and descriptors.dtype != np.uint8
+        if descriptors is None:
+            descriptors = np.empty((0, dimension), np.uint8)
+        elif float_descriptors and descriptors.size and (
+                descriptors.min() >= 0 and descriptors.max() <= 255
+                and np.array_equal(descriptors, np.round(descriptors))):
+            # SIFT 描述子在 OpenCV 中已饱和取整到 0~255，转为 uint8 不损失信息
+            descriptors = descriptors.astype(np.uint8)
+        # 没有关键点时 cv2.KeyPoint_convert 返回空元组
+        if count:
+            points = cv2.KeyPoint_convert(keypoints).reshape(count, 2).astype(np.float32)
+        else:
+            points = np.empty((0, 2), np.float32)
+        return cls(
+            detector,
+            points,
+            np.array([kp.size for kp in keypoints], np.float32),
+            np.array([kp.angle for kp in keypoints], np.float32),
+            np.array([kp.response for kp in keypoints], np.float32),
+            np.array([kp.octave for kp in keypoints], np.int32),
+            np.ascontiguousarray(descriptors),
+            float_descriptors,
+        )
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.points, self.sizes, self.angles, self.responses,
+                                              self.octaves, self.descriptors))
+
+    @property
+    def descriptor_size(self):
+        return self.descriptors.shape[1] if self.descriptors.ndim == 2 else 0
+
+    def points_yx(self):
+        """坐标截断为整数，(N, 2) int32，每行为 (y, x)"""
+        return np.ascontiguousarray(self.points[:, ::-1].astype(np.int32))
+
+    def matching_descriptors(self):
+        """匹配用的描述子：SIFT 还原为 float32，ORB 保持 uint8"""
+        if self.float_descriptors:
+            return self.descriptors.astype(np.float32)
+        return self.descriptors
+
+    def to_opencv(self):
+        """还原为 cv2.KeyPoint 列表（绘制、匹配时使用）"""
+        return [cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave))
+                for (x, y), size, angle, response, octave in zip(
+                    self.points.tolist(), self.sizes.tolist(), self.angles.tolist(),
+                    self.responses.tolist(), self.octaves.tolist())]
+
+    def top(self, count):
+        """响应最强的前 count 个关键点（count 不小于总数时返回自身）"""
+        if count is None or count >= len(self):
+            return self
+        order = np.argsort(-self.responses, kind="stable")[:count]
+        return KeypointSet(self.detector, self.points[order], self.sizes[order], self.angles[order],
+                           self.responses[order], self.octaves[order], self.descriptors[order],
+                           self.float_descriptors)
+
+
+class DetectorPool:
+    """按 (检测器, 参数) 复用 OpenCV 检测器对象；同一实例同一时刻只借给一个线程"""
+
+    def __init__(self, max_param_sets=POOL_PARAM_SETS):
+        self.max_param_sets = int(max_param_sets)
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def acquire(self, detector, params):
+        key = (detector, tuple(sorted(params.items())))
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            instance = idle.pop() if idle else None
+            while len(self._idle) > self.max_param_sets:
+                self._idle.popitem(last=False)
+            if instance is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if instance is None:
+            instance = DETECTORS[detector](**params)
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._idle.setdefault(key, []).append(instance)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "param_sets": len(self._idle),
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "created": self.created,
+                "reused": self.reused,
+            }
+
+
+_pool = DetectorPool()
+
+
+def detect_keypoints(gray, detector, params=None, image_key=None, use_cache=True):
+    """
+    检测关键点并计算描述子（按灰度图内容、检测器和参数缓存）
+
+    参数:
+    - gray: 单通道 uint8 图像
+    - detector: DETECTORS 中的名称
+    - params: 传给 cv2.SIFT_create / cv2.ORB_create 的参数
+    - image_key: 已知的灰度图内容哈希，省略时自动计算
+    - use_cache: False 时不读写缓存，每次重新检测（计时对比时使用）
+
+    返回: KeypointSet（数组只读）
+    """
+    params = dict(params or {})
+    key = None
+    if use_cache:
+        if image_key is None:
+            image_key = compute_image_hash(gray)
+        key = make_cache_key(image_key, f"keypoints:{detector}", params)
+        keypoint_set = _keypoint_cache.get(key)
+        if keypoint_set is not None:
+            return keypoint_set
+    with _pool.acquire(detector, params) as instance:
+        keypoints, descriptors = instance.detectAndCompute(gray, None)
+    keypoint_set = KeypointSet.from_opencv(detector, keypoints, descriptors)
+    if key is not None:
+        _keypoint_cache.put(key, keypoint_set, keypoint_set.nbytes)
+    return keypoint_set
+
+
+def draw_keypoints(image_bgr, keypoint_set, style="rich"):
+    """按绘制样式画出关键点，返回新的 BGR 图像"""
+    return cv2.drawKeypoints(image_bgr, keypoint_set.to_opencv(), None, flags=DRAW_STYLES[style])
+
+
+def keypoint_cache_stats():
+    """关键点缓存与检测器对象池的统计信息"""
+    stats = _keypoint_cache.stats()
+    stats["pool"] = _pool.stats()
+    return stats
+
+
+@register_content_cache
+def clear_keypoint_cache():
+    """清空关键点缓存（基准测试计时前调用，避免测到缓存命中；检测器对象池保留）"""
+    _keypoint_cache.clear()
@@ -0,0 +1,251 @@
+"""
+图像处理实验室的算子声明表
+
+每个算子对应实验室页面中的一个处理函数，参数名与函数签名一致，
+取值范围与页面上的滑块保持一致；scale 标注预览时参数如何随图像尺寸换算。
+"""
+from . import config, pointops
+from .registry import Operator, OperatorRegistry, ParamSpec
+
+P = ParamSpec
+
+LAB_OPERATORS = (
+    # 1. 图像增强
+    Operator("histogram_equalization", "apply_histogram_equalization", "直方图均衡化", "图像增强"),
+    Operator("histogram_equalization_advanced", "apply_histogram_equalization_advanced", "直方图均衡化（可调强度）", "图像增强", (
+        P("strength", "float", 1.0, 0.0, 10.0, label="均衡化强度"),
+        P("channel_mode", "choice", "所有通道", choices=("所有通道", "仅亮度通道"), label="应用通道"),
+        P("protect_brightness", "bool", True, label="保护原图亮度"),
+    )),
+    Operator("clahe_equalization", "apply_clahe_equalization", "自适应直方图均衡化", "图像增强", (
+        P("clip_limit", "float", 2.0, 1.0, 30.0, label="对比度限制"),
+        P("tile_size", "int", 8, 2, 64, label="网格大小"),
+        P("protect_brightness", "bool", True, label="保护原图亮度"),
+    )),
+    Operator("contrast", "apply_contrast_adjustment", "对比度调整", "图像增强", (
+        P("alpha", "float", 1.2, 0.0, 10.0, label="对比度系数"),
+        P("beta", "float", 0, -255, 255, label="亮度调整"),
+    ), point_ops=lambda p: [pointops.contrast(p["alpha"], p["beta"])]),
+    Operator("gamma", "apply_gamma_correction", "伽马校正", "图像增强", (
+        P("gamma", "float", 1.0, 0.01, 10.0, label="伽马值"),
+    ), point_ops=lambda p: [pointops.gamma(p["gamma"])]),
+    Operator("clahe", "apply_clahe", "CLAHE增强", "图像增强", (
+        P("clip_limit", "float", 2.0, 0.1, 40.0, label="对比度限制"),
+        P("tile_grid_size", "vector", (8, 8), 1, 64, length=2, label="网格大小"),
+    )),
+
+    # 2. 边缘检测
+    Operator("canny", "apply_canny_edge", "Canny边缘检测", "边缘检测", (
+        P("threshold1", "int", 50, 0, 1000, label="低阈值"),
+        P("threshold2", "int", 150, 0, 1000, label="高阈值"),
+    )),
+    Operator("sobel", "apply_sobel_edge", "Sobel边缘检测", "边缘检测", (
+        P("ksize", "int", 3, 1, 31, label="核大小"),
+    )),
+    Operator("laplacian", "apply_laplacian_edge", "Laplacian边缘检测", "边缘检测"),
+
+    # 3. 线性变换
+    Operator("affine", "apply_affine_transform", "仿射变换", "线性变换", (
+        P("angle", "float", 0, -360, 360, label="旋转角度"),
+        P("scale", "float", 1.0, 0.01, 10.0, label="缩放比例"),
+        P("tx", "float", 0, label="水平平移", scale="length"),
+        P("ty", "float", 0, label="垂直平移", scale="length"),
+    )),
+    Operator("perspective", "apply_perspective_transform", "透视变换", "线性变换", (
+        P("perspective_strength", "float", 0.1, 0.0, 0.5, label="透视强度"),
+    )),
+
+    # 4. 图像锐化
+    Operator("sharpen", "apply_sharpen_filter", "锐化滤波器", "图像锐化", (
+        P("kernel_size", "int", 3, 3, 31, label="滤波器大小", scale="kernel"),
+    )),
+    Operator("unsharp_masking", "apply_unsharp_masking", "非锐化掩蔽", "图像锐化", (
+        P("sigma", "float", 1.0, 0.1, 20.0, label="模糊程度", scale="length"),
+        P("amount", "float", 1.0, 0.0, 10.0, label="锐化强度"),
+    )),
+    Operator("laplacian_sharpening", "apply_laplacian_sharpening", "拉普拉斯锐化", "图像锐化"),
+    Operator("high_boost", "apply_high_boost_filter", "高频提升滤波", "图像锐化", (
+        P("A", "float", 1.5, 1.0, 10.0, label="提升系数"),
+    )),
+    Operator("adaptive_sharpen", "apply_adaptive_sharpen", "自适应锐化", "图像锐化", (
+        P("strength", "float", 0.5, 0.0, 2.0, label="锐化强度"),
+    )),
+
+    # 5. 采样与量化
+    Operator("sampling", "apply_sampling", "图像采样", "采样与量化", (
+        P("ratio", "int", 2, 1, 64, label="采样比例"),
+    )),
+    Operator("quantization", "apply_quantization", "图像量化", "采样与量化", (
+        P("levels", "int", 16, 2, 256, label="量化级别"),
+    ), point_ops=lambda p: [pointops.quantize(p["levels"])]),
+
+    # 6. 彩色图像分割
+    Operator("rgb_segmentation", "apply_rgb_segmentation", "RGB颜色分割", "彩色图像分割", (
+        P("lower_color", "vector", (0, 0, 0), 0, 255, length=3, label="下限 (B, G, R)"),
+        P("upper_color", "vector", (255, 255, 255), 0, 255, length=3, label="上限 (B, G, R)"),
+    )),
+    Operator("hsv_segmentation", "apply_hsv_segmentation", "HSV颜色分割", "彩色图像分割", (
+        P("lower_hsv", "vector", (0, 0, 0), 0, 255, length=3, label="下限 (H, S, V)"),
+        P("upper_hsv", "vector", (179, 255, 255), 0, 255, length=3, label="上限 (H, S, V)"),
+    )),
+
+    # 7. 颜色通道分析
+    Operator("split_channels", "split_channels", "RGB通道分离", "颜色通道分析", returns="images"),
+    Operator("adjust_channel", "adjust_channel", "通道调整", "颜色通道分析", (
+        P("channel_index", "int", 2, 0, 2, label="通道索引 (B=0, G=1, R=2)"),
+        P("value", "int", 0, -255, 255, label="调整值"),
+    ), point_ops=lambda p: [pointops.offset(p["value"], channel=p["channel_index"])]),
+
+    # 8. 特效处理
+    Operator("rain", "add_rain_effect", "雨点特效", "特效处理", (
+        P("intensity", "int", 150, 0, 5000, label="雨点密度", scale="area"),
+        P("opacity", "float", 0.5, 0.0, 1.0, label="透明度"),
+        P("seed", "int", 0, 0, 2 ** 31 - 1, label="随机种子"),
+    ), version=2),
+    Operator("snow", "add_snow_effect", "雪花特效", "特效处理", (
+        P("intensity", "int", 300, 0, 10000, label="雪花密度", scale="area"),
+        P("opacity", "float", 0.3, 0.0, 1.0, label="透明度"),
+        P("seed", "int", 0, 0, 2 ** 31 - 1, label="随机种子"),
+    ), version=2),
+    Operator("sakura", "apply_sakura_effect", "樱花特效", "特效处理", (
+        P("sakura_intensity", "float", 0.8, 0.0, 5.0, label="樱花密度"),
+        P("seed", "int", 0, 0, 2 ** 31 - 1, label="随机种子"),
+    ), version=2),
+    Operator("starry_night", "add_starry_night_effect", "星空特效", "特效处理", (
+        P("stars", "int", 150, 0, 5000, label="星星数量", scale="area"),
+        P("seed", "int", 0, 0, 2 ** 31 - 1, label="随机种子"),
+    ), version=2),
+
+    # 9. 图像绘画
+    Operator("oil_painting", "apply_oil_painting_effect", "油画效果", "图像绘画", (
+        P("radius", "int", 3, 1, 20, label="笔触半径", scale="length"),
+        P("intensity", "int", 25, 1, 100, label="油画强度"),
+        P("enhance_color", "bool", True, label="色彩增强"),
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    )),
+    Operator("pencil_sketch", "apply_pencil_sketch_effect", "铅笔素描", "图像绘画", (
+        P("style", "choice", "elegant", choices=("elegant", "artistic", "classic"), label="素描类型"),
+        P("intensity", "float", 1.0, 0.1, 5.0, label="素描强度"),
+    )),
+    Operator("ink_wash", "apply_ink_wash_painting_effect", "水墨画效果", "图像绘画", (
+        P("ink_strength", "float", 0.4, 0.0, 1.0, label="墨迹浓度"),
+        P("paper_texture", "bool", True, label="宣纸纹理"),
+    )),
+    Operator("comic", "apply_comic_effect", "漫画风格", "图像绘画", (
+        P("edge_threshold", "int", 50, 1, 255, label="轮廓粗细"),
+        P("color_style", "choice", "vibrant", choices=("vibrant", "soft"), label="颜色风格"),
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    ), version=2),
+    Operator("watercolor", "apply_watercolor_effect", "水彩画效果", "图像绘画", (
+        P("style", "choice", "classic", choices=("classic", "modern"), label="风格类型"),
+        P("texture_strength", "float", 0.3, 0.0, 1.0, label="纹理强度"),
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    ), version=2),
+    Operator("pop_art", "apply_pop_art_effect", "波普艺术效果", "图像绘画", (
+        P("style", "str", "warhol", label="波普风格"),
+        P("num_colors", "int", 8, 2, 32, label="颜色数量"),
+    ), version=2),
+    Operator("impressionist", "apply_impressionist_effect", "印象派效果", "图像绘画", (
+        P("brush_size", "int", 3, 1, 20, label="笔触大小", scale="length"),
+    )),
+    Operator("pastel", "apply_pastel_effect", "粉彩效果", "图像绘画", (
+        P("softness", "float", 0.7, 0.0, 1.0, label="柔和度"),
+    )),
+
+    # 10. 风格迁移
+    Operator("saturation", "scale_saturation", "饱和度调整", "风格迁移", (
+        P("factor", "float", 1.0, 0.0, 5.0, label="饱和度系数"),
+    )),
+    Operator("lab_blue", "scale_lab_blue", "蓝色强度调整", "风格迁移", (
+        P("factor", "float", 1.0, 0.0, 5.0, label="蓝色强度"),
+    )),
+    Operator("van_gogh", "apply_van_gogh_style", "梵高风格", "风格迁移", (
+        P("twist_strength", "float", 0.001, 0.0, 0.05, label="扭曲强度", scale="inverse"),
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    )),
+    Operator("starry_sky", "apply_starry_sky_style", "星空风格", "风格迁移", (
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    )),
+    Operator("monet", "apply_monet_style", "莫奈印象派", "风格迁移", version=2),
+    Operator("picasso", "apply_picasso_cubist_style", "毕加索立体主义", "风格迁移", version=3),
+    Operator("anime", "apply_anime_style", "动漫风格", "风格迁移", (
+        P("quality", "float", config.MULTIRES_QUALITY / 100, 0.05, 1.0, label="多分辨率粗层比例"),
+    ), version=2),
+
+    # 11. 老照片上色
+    Operator("colorize", "colorize_old_photo", "AI增强上色", "老照片上色", (
+        P("color_intensity", "float", 1.0, 0.0, 3.0, label="色彩强度"),
+        P("ai_assist", "bool", True, label="AI智能识别"),
+    )),
+
+    # 12. 数字形态学
+    Operator("erosion", "apply_erosion", "腐蚀", "数字形态学", (
+        P("kernel_size", "int", 5, 1, 51, label="核大小", scale="kernel"),
+    )),
+    Operator("dilation", "apply_dilation", "膨胀", "数字形态学", (
+        P("kernel_size", "int", 5, 1, 51, label="核大小", scale="kernel"),
+    )),
+    Operator("opening", "apply_opening", "开运算", "数字形态学", (
+        P("kernel_size", "int", 5, 1, 51, label="核大小", scale="kernel"),
+    )),
+    Operator("closing", "apply_closing", "闭运算", "数字形态学", (
+        P("kernel_size", "int", 5, 1, 51, label="核大小", scale="kernel"),
+    )),
+
+    # 13. 图像特征提取
+    Operator("harris", "extract_harris_corners_advanced", "角点检测 (Harris)", "图像特征提取", (
+        P("max_corners", "int", 200, 1, 100000, label="最大角点数"),
+        P("quality_level", "float", 0.05, 0.0, 1.0, label="质量水平"),
+        P("min_distance", "int", 10, 0, 1000, label="最小距离"),
+    ), returns="features", version=2),
+    Operator("shi_tomasi", "extract_shi_tomasi_corners_advanced", "角点检测 (Shi-Tomasi)", "图像特征提取", (
+        P("max_corners", "int", 200, 1, 100000, label="最大角点数"),
+        P("quality_level", "float", 0.05, 0.0, 1.0, label="质量水平"),
+        P("min_distance", "int", 10, 0, 1000, label="最小距离"),
+    ), returns="features", version=2),
+    Operator("canny_features", "extract_canny_edges_advanced", "边缘检测 (Canny)", "图像特征提取", (
+        P("threshold1", "int", 50, 0, 1000, label="低阈值"),
+        P("threshold2", "int", 150, 0, 1000, label="高阈值"),
+        P("aperture_size", "choice", 3, choices=(3, 5, 7), label="Sobel算子大小"),
+    ), returns="features", version=2),
+    Operator("sobel_features", "extract_sobel_edges_advanced", "边缘检测 (Sobel)", "图像特征提取", (
+        P("ksize", "choice", 3, choices=(1, 3, 5, 7), label="核大小"),
+        P("direction", "choice", "XY方向", choices=("X方向", "Y方向", "XY方向", "梯度幅值"), label="方向"),
+        P("scale", "float", 1.0, 0.0, 10.0, label="缩放因子"),
+    ), returns="features", version=2),
+    Operator("lbp", "extract_lbp_texture_advanced", "纹理分析 (LBP)", "图像特征提取", (
+        P("radius", "int", 1, 1, 16, label="LBP半径"),
+        P("n_points", "int", 8, 4, 32, label="采样点数"),
+        P("method", "choice", "基本LBP", choices=("基本LBP", "旋转不变LBP", "均匀模式LBP"), label="LBP模式"),
+    ), returns="features", version=2),
+    Operator("lbp_multiscale", "extract_lbp_multiscale", "多尺度LBP", "图像特征提取", (
+        P("method", "choice", "均匀模式LBP", choices=("基本LBP", "旋转不变LBP", "均匀模式LBP"), label="LBP模式"),
+    ), returns="table"),
+    Operator("glcm", "extract_glcm_texture_advanced", "纹理分析 (GLCM)", "图像特征提取", (
+        P("distance", "int", 1, 1, 64, label="像素距离"),
+        P("angle", "choice", "0°", choices=("0°", "45°", "90°", "135°", "所有角度"), label="角度"),
+        P("feature_name", "choice", "对比度", choices=("对比度", "相关性", "能量", "同质性", "ASM", "熵"), label="纹理特征"),
+        P("symmetric", "bool", False, label="对称GLCM"),
+    ), returns="features", version=2),
+    Operator("glcm_table", "extract_glcm_feature_table", "GLCM特征表", "图像特征提取", (
+        P("distances", "vector", (1, 2, 3, 4, 5), 1, 64, label="像素距离"),
+        P("symmetric", "bool", False, label="对称GLCM"),
+    ), returns="table"),
+    Operator("sift", "extract_sift_features_advanced", "高级特征 (SIFT)", "图像特征提取", (
+        P("nfeatures", "int", 0, 0, 100000, label="特征点数量"),
+        P("nOctaveLayers", "int", 3, 1, 16, label="八度层数"),
+        P("contrastThreshold", "float", 0.04, 0.0, 1.0, label="对比度阈值"),
+        P("draw_style", "choice", "尺度与方向", choices=("尺度与方向", "仅位置"), label="绘制样式"),
+    ), returns="features", version=2),
+    Operator("orb", "extract_orb_features_advanced", "高级特征 (ORB)", "图像特征提取", (
+        P("nfeatures", "int", 500, 1, 100000, label="特征点数量"),
+        P("scaleFactor", "float", 1.2, 1.01, 4.0, label="尺度因子"),
+        P("nlevels", "int", 8, 1, 32, label="金字塔层数"),
+        P("draw_style", "choice", "尺度与方向", choices=("尺度与方向", "仅位置"), label="绘制样式"),
+    ), returns="features", version=2),
+)
+
+
+def build_lab_registry(namespace):
+    """用给定的命名空间（通常是页面的 globals()）构建实验室算子注册表"""
+    return OperatorRegistry(namespace, LAB_OPERATORS)
@@ -0,0 +1,50 @@
+"""
+无界面加载实验室处理函数
+
+实验室页面是一个 Streamlit 脚本，直接 import 会设置页面、初始化数据库并渲染整个界面。
+这里解析页面源码，只执行其中的 import、函数/类定义和常量赋值（全大写或下划线开头的名字），
+得到包含全部 apply_* / extract_* 处理函数的命名空间，供批处理、基准测试等命令行工具使用。
+"""
+import ast
+import os
+
+LAB_PAGE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "pages", "1_🔬_图像处理实验室.py",
+)
+
+_namespaces = {}
+
+
+def _is_constant_target(target):
+    return isinstance(target, ast.Name) and (target.id.isupper() or target.id.startswith("_"))
+
+
+def _keep_node(node):
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    if isinstance(node, ast.Assign):
+        return all(_is_constant_target(target) for target in node.targets)
+    if isinstance(node, ast.AnnAssign):
+        return _is_constant_target(node.target)
+    return False
+
+
+def load_lab_namespace(page_path=None):
+    """
+    加载实验室页面中的处理函数（同一进程内只加载一次）
+
+    返回: 页面模块级命名空间的子集，可直接传给 build_lab_registry
+    """
+    page_path = os.path.abspath(page_path or LAB_PAGE_PATH)
+    namespace = _namespaces.get(page_path)
+    if namespace is not None:
+        return namespace
+
+    with open(page_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=page_path)
+    module = ast.Module(body=[node for node in tree.body if _keep_node(node)], type_ignores=[])
+    namespace = {"__name__": "lab_page", "__file__": page_path}
+    exec(compile(module, page_path, "exec"), namespace)
+    _namespaces[page_path] = namespace
+    return namespace
@@ -0,0 +1,132 @@
+"""
+特征匹配与图像配准
+
+两幅图像的 SIFT/ORB 描述子用近似最近邻索引匹配：
+- SIFT（浮点描述子）使用 FLANN 随机 KD 树，ORB（二进制描述子）使用 FLANN 局部敏感哈希（LSH）；
+- 每个查询点取 2 个近邻做 Lowe 比值检验，再用 RANSAC 估计单应矩阵并筛出内点；
+- 建索引、匹配、RANSAC 分别计时，可选地同时运行暴力匹配作对比，直观体现近似索引的意义。
+描述子直接取自 lab_engine.keypoints 的缓存，匹配时不重新检测。
+"""
+import time
+
+import cv2
+import numpy as np
+
+from .keypoints import DRAW_STYLES
+
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_LSH = 6
+
+# 各检测器使用的 FLANN 索引参数和暴力匹配的距离
+INDEX_PARAMS = {
+    "sift": {"algorithm": FLANN_INDEX_KDTREE, "trees": 5},
+    "orb": {"algorithm": FLANN_INDEX_LSH, "table_number": 6, "key_size": 12, "multi_probe_level": 1},
+}
+BRUTE_FORCE_NORMS = {
+    "sift": cv2.NORM_L2,
+    "orb": cv2.NORM_HAMMING,
+}
+# 估计单应矩阵至少需要的匹配数
+MIN_HOMOGRAPHY_MATCHES = 4
+
+
+def _ratio_test(knn_matches, ratio):
+    """Lowe 比值检验，返回 (M, 2) int32 数组，每行为 (查询点下标, 训练点下标)"""
+    pairs = [(pair[0].queryIdx, pair[0].trainIdx) for pair in knn_matches
+             if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance]
+    return np.array(pairs, np.int32).reshape(-1, 2)
+
+
+def match_keypoint_sets(query, train, ratio=0.75, ransac_threshold=5.0, checks=50, brute_force=False):
+    """
+    匹配两组关键点并估计单应矩阵
+
+    参数:
+    - query, train: 同一检测器得到的 KeypointSet
+    - ratio: 比值检验阈值
+    - ransac_threshold: RANSAC 重投影误差阈值（像素）
+    - checks: FLANN 搜索时检查的叶子数，越大越准越慢
+    - brute_force: 是否同时运行暴力匹配并计时（结果不参与后续计算）
+
+    返回: 字典
+    - matches: (M, 2) int32，通过比值检验的 (query 下标, train 下标)
+    - inliers: (M,) bool，RANSAC 内点
+    - homography: 3x3 单应矩阵，匹配不足时为 None
+    - timing: 各阶段耗时（秒）：建索引、匹配、RANSAC，以及可选的暴力匹配
+    """
+    if query.detector != train.detector:
+        raise ValueError(f"两组关键点来自不同的检测器: {query.detector} / {train.detector}")
+    detector = query.detector
+    timing = {}
+    result = {"matches": np.empty((0, 2), np.int32), "inliers": np.zeros(0, bool),
+              "homography": None, "timing": timing}
+    if len(query) < 2 or len(train) < 2:
+        return result
+
+    query_descriptors = query.matching_descriptors()
+    train_descriptors = train.matching_descriptors()
+
+    start = time.perf_counter()
+    matcher = cv2.FlannBasedMatcher(INDEX_PARAMS[detector], {"checks": int(checks)})
+    matcher.add([train_descriptors])
+    matcher.train()
+    timing["建索引"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    knn_matches = matcher.knnMatch(query_descriptors, k=2)
+    matches = _ratio_test(knn_matches, ratio)
+    timing["匹配"] = time.perf_counter() - start
+    result["matches"] = matches
+
+    if brute_force:
+        start = time.perf_counter()
+        cv2.BFMatcher(BRUTE_FORCE_NORMS[detector]).knnMatch(query_descriptors, train_descriptors, k=2)
+        timing["暴力匹配"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    inliers = np.zeros(len(matches), bool)
+    if len(matches) >= MIN_HOMOGRAPHY_MATCHES:
+        source = query.points[matches[:, 0]].reshape(-1, 1, 2)
+        target = train.points[matches[:, 1]].reshape(-1, 1, 2)
+        homography, mask = cv2.findHomography(source, target, cv2.RANSAC, float(ransac_threshold))
+        if homography is not None:
+            result["homography"] = homography
+            inliers = mask.ravel().astype(bool)
+    timing["RANSAC"] = time.perf_counter() - start
+    result["inliers"] = inliers
+    return result
+
+
+def _scaled_keypoints(keypoint_set, indices, scale):
+    return [cv2.KeyPoint(float(x) * scale, float(y) * scale, float(size) * scale)
+            for (x, y), size in zip(keypoint_set.points[indices].tolist(), keypoint_set.sizes[indices].tolist())]
+
+
+def _fit(image, max_side):
+    scale = min(1.0, max_side / float(max(image.shape[:2])))
+    if scale >= 1.0:
+        return image, 1.0
+    size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def draw_matches(query_bgr, query, train_bgr, train, match_result, inliers_only=True, max_side=1200,
+                 style="points"):
+    """
+    并排绘制两幅图像及匹配连线（默认只画 RANSAC 内点）
+
+    大图先缩小到最长边 max_side 再绘制，关键点坐标按同样比例换算。
+    返回: BGR 图像
+    """
+    matches = match_result["matches"]
+    if inliers_only and len(match_result["inliers"]) == len(matches) and match_result["homography"] is not None:
+        matches = matches[match_result["inliers"]]
+    query_small, query_scale = _fit(query_bgr, max_side)
+    train_small, train_scale = _fit(train_bgr, max_side)
+    # 只传入参与连线的关键点，下标重新编号
+    query_points = _scaled_keypoints(query, matches[:, 0], query_scale)
+    train_points = _scaled_keypoints(train, matches[:, 1], train_scale)
+    dmatches = [cv2.DMatch(index, index, 0.0) for index in range(len(matches))]
+    return cv2.drawMatches(query_small, query_points, train_small, train_points, dmatches, None,
+                           matchColor=(0, 255, 0), singlePointColor=(255, 0, 0),
+                           flags=DRAW_STYLES[style] | cv2.DRAW_MATCHES_FLAGS_NOT_DRAW_SINGLE_POINTS)
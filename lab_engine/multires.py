@@ -0,0 +1,92 @@
+"""
+多分辨率（由粗到细）执行
+
+cv2.stylization、detailEnhance、pencilSketch、pyrMeanShiftFiltering 和大核双边滤波等
+保边滤波的耗时随像素数增长，而它们的输出主要由低频的平滑区域和边缘构成。
+大图先缩小到金字塔的粗层执行滤波，再以原图为引导做引导滤波上采样（fast guided upsampling）：
+在粗层上对每个通道拟合局部线性模型 输出 ≈ a·原图 + b，把 a、b 放大到原分辨率后
+按原图重建输出，使边缘和细节贴合原图，而不是简单放大后的模糊结果。
+
+quality 为粗层相对原图的边长比例：1.0 表示始终按原分辨率计算，越小越快。
+只有像素数超过 MULTIRES_MIN_PIXELS 的图像才会降采样。
+"""
+import cv2
+import numpy as np
+
+from . import config
+
+
+def coarse_scale(image, quality=None, min_pixels=None):
+    """粗层的缩放比例；不需要降采样时返回 1.0"""
+    quality = config.MULTIRES_QUALITY / 100 if quality is None else quality
+    min_pixels = config.MULTIRES_MIN_PIXELS if min_pixels is None else min_pixels
+    height, width = image.shape[:2]
+    if quality >= 1.0 or height * width <= min_pixels:
+        return 1.0
+    return max(float(quality), 0.05)
+
+
+def _box(image, radius):
+    return cv2.boxFilter(image, cv2.CV_32F, (2 * radius + 1, 2 * radius + 1))
+
+
+def guided_upsample(guide, coarse_guide, coarse_output, radius=1, eps=1e-4):
+    """
+    引导滤波上采样
+
+    参数:
+    - guide: 原分辨率引导图（uint8，单通道或与输出通道数相同）
+    - coarse_guide: 缩小到粗层的引导图
+    - coarse_output: 粗层上的滤波结果
+    - radius: 粗层上局部线性模型的窗口半径
+    - eps: 正则项（按 [0, 1] 归一化的强度计），越大输出越平滑、越接近直接放大
+
+    返回: 原分辨率 uint8 结果，通道数与 coarse_output 相同
+    """
+    height, width = guide.shape[:2]
+    low_guide = coarse_guide.astype(np.float32) / 255
+    low_output = coarse_output.astype(np.float32) / 255
+    if low_output.ndim == 2 and low_guide.ndim == 3:
+        low_guide = cv2.cvtColor(low_guide, cv2.COLOR_BGR2GRAY)
+        guide = cv2.cvtColor(guide, cv2.COLOR_BGR2GRAY)
+    elif low_output.ndim == 3 and low_guide.ndim == 2:
+        low_guide = cv2.merge([low_guide] * low_output.shape[2])
+        guide = cv2.merge([guide] * low_output.shape[2])
+
+    # 1. 粗层上逐通道拟合 a、b（引导图与输出同一通道对应）
+    mean_i = _box(low_guide, radius)
+    mean_p = _box(low_output, radius)
+    cov_ip = _box(low_guide * low_output, radius) - mean_i * mean_p
+    var_i = _box(low_guide * low_guide, radius) - mean_i * mean_i
+    a = cov_ip / (var_i + eps)
+    b = mean_p - a * mean_i
+    mean_a = _box(a, radius)
+    mean_b = _box(b, radius)
+
+    # 2. 放大系数后按原图重建
+    mean_a = cv2.resize(mean_a, (width, height), interpolation=cv2.INTER_LINEAR)
+    mean_b = cv2.resize(mean_b, (width, height), interpolation=cv2.INTER_LINEAR)
+    result = mean_a * (guide.astype(np.float32) * (1 / 255)) + mean_b
+    return np.clip(result * 255 + 0.5, 0, 255).astype(np.uint8)
+
+
+def run_multires(func, image, quality=None, radius=1, eps=1e-4, min_pixels=None):
+    """
+    在粗层上执行保边滤波，再引导上采样回原分辨率
+
+    参数:
+    - func: func(image, scale) -> 结果图像；scale 为粗层比例，用于换算与尺寸相关的参数（如 sigma_s）
+    - image: uint8 图像
+    - quality: 粗层边长比例，None 时使用配置 LAB_MULTIRES_QUALITY
+    - radius, eps: 引导上采样的窗口半径和正则项
+    - min_pixels: 启用降采样的最小像素数，None 时使用配置
+
+    返回: 与原图同尺寸的结果
+    """
+    scale = coarse_scale(image, quality, min_pixels)
+    if scale >= 1.0:
+        return func(image, 1.0)
+    height, width = image.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    coarse = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return guided_upsample(image, coarse, func(coarse, scale), radius, eps)
@@ -0,0 +1,134 @@
+"""
+调色板量化服务
+
+波普艺术、立体主义等风格需要把图像颜色简化为 k 种：
+- 调色板只在随机像素子样本上拟合（k-means++ 初始化后做 Lloyd 迭代），与图像尺寸无关；
+- 像素映射不逐像素计算距离，而是预先为 32×32×32 颜色立方体的每个格子求出最近的调色板颜色，
+  整图按颜色高 5 位查表；
+- 调色板按 (图像内容哈希, k) 缓存，同一张图像只改颜色数或风格时不必重新读取整幅图像聚类。
+子样本和初始化都由图像哈希决定随机种子，同一张图像每次得到相同的调色板。
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from . import config
+from .cache import ResultCache, compute_image_hash, register_content_cache
+
+# 拟合调色板使用的像素样本数
+PALETTE_SAMPLE = 20000
+# 颜色立方体每个通道保留的位数（5 位即 32³ 个格子）
+CUBE_BITS = 5
+
+_palette_cache = ResultCache(max_bytes=16 * 1024 * 1024, max_entries=config.PALETTE_CACHE_ENTRIES)
+
+
+def sample_pixels(image, sample=PALETTE_SAMPLE, seed=0):
+    """有放回地随机抽取最多 sample 个像素，返回 (n, C) float32"""
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    pixels = image.reshape(-1, channels)
+    if len(pixels) > sample:
+        pixels = pixels[np.random.default_rng(seed).integers(0, len(pixels), sample)]
+    return pixels.astype(np.float32)
+
+
+def _nearest(pixels, centers):
+    """每个像素最近的中心下标（|p|² 对同一像素是常数，比较时省略）"""
+    distances = (centers ** 2).sum(axis=1)[None, :] - 2 * pixels @ centers.T
+    return distances.argmin(axis=1)
+
+
+def fit_palette(pixels, k, seed=0, iterations=20):
+    """
+    在像素样本上做 k-means，返回 (k, C) uint8 调色板
+
+    不同颜色数不超过 k 时直接返回这些颜色。
+    """
+    pixels = np.asarray(pixels, np.float32)
+    unique = np.unique(pixels, axis=0)
+    if len(unique) <= k:
+        return np.clip(np.round(unique), 0, 255).astype(np.uint8)
+
+    # 1. k-means++ 初始化
+    rng = np.random.default_rng(seed)
+    centers = [pixels[rng.integers(len(pixels))]]
+    nearest = ((pixels - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = nearest.sum()
+        index = rng.choice(len(pixels), p=nearest / total) if total > 0 else rng.integers(len(pixels))
+        centers.append(pixels[index])
+        nearest = np.minimum(nearest, ((pixels - pixels[index]) ** 2).sum(axis=1))
+    centers = np.array(centers, np.float32)
+
+    # 2. Lloyd 迭代，空簇保留原中心
+    for _ in range(iterations):
+        labels = _nearest(pixels, centers)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, pixels)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.abs(updated - centers).max() < 0.5:
+            centers = updated
+            break
+        centers = updated
+    return np.clip(np.round(centers), 0, 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=64)
+def _cube_table(palette_bytes, channels):
+    """颜色立方体每个格子（取格子中心）最近的调色板颜色，返回 (32^C, C) 只读颜色表"""
+    palette = np.frombuffer(palette_bytes, np.uint8).reshape(-1, channels)
+    levels = 1 << CUBE_BITS
+    step = 256 // levels
+    centers = np.arange(levels, dtype=np.float32) * step + (step - 1) / 2
+    grid = np.stack(np.meshgrid(*([centers] * channels), indexing="ij"), axis=-1).reshape(-1, channels)
+    table = palette[_nearest(grid, palette.astype(np.float32))]
+    table.flags.writeable = False
+    return table
+
+
+def quantize_image(image, palette):
+    """把图像每个像素替换为调色板颜色（按颜色高 5 位查颜色立方体表）"""
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    palette = np.ascontiguousarray(palette, np.uint8).reshape(-1, channels)
+    table = _cube_table(palette.tobytes(), channels)
+    codes = (image >> (8 - CUBE_BITS)).astype(np.uint16)
+    if channels == 1:
+        return table[codes][..., 0]
+    index = codes[..., 0]
+    for channel in range(1, channels):
+        index = (index << CUBE_BITS) | codes[..., channel]
+    return table[index]
+
+
+def get_palette(image, k, image_key=None):
+    """
+    获取图像的 k 色调色板（按图像内容哈希和 k 缓存）
+
+    参数:
+    - image: uint8 图像
+    - k: 颜色数
+    - image_key: 已知的图像内容哈希，省略时自动计算
+    """
+    if image_key is None:
+        image_key = compute_image_hash(image)
+    key = (image_key, int(k))
+    palette = _palette_cache.get(key)
+    if palette is None:
+        seed = int(image_key[:8], 16)
+        palette = fit_palette(sample_pixels(image, seed=seed), int(k), seed=seed)
+        palette.flags.writeable = False
+        _palette_cache.put(key, palette)
+    return palette
+
+
+def palette_cache_stats():
+    """调色板缓存统计信息"""
+    return _palette_cache.stats()
+
+
+@register_content_cache
+def clear_palette_cache():
+    """清空调色板缓存和颜色立方体表（基准测试计时前调用，避免测到缓存命中）"""
+    _palette_cache.clear()
+    _cube_table.cache_clear()
@@ -0,0 +1,160 @@
+"""
+批量粒子渲染
+
+雨滴、雪花、樱花、星星等特效由大量相同形状、不同位置和颜色的粒子组成。
+逐个粒子调用 cv2.line / cv2.circle 时，耗时主要花在 Python 调用开销上，随图像面积线性增长。
+这里把每种形状预先画成小的标签图（sprite，0 为空白，1、2… 为不同部位），
+粒子的位置、形状参数和颜色全部用 NumPy 数组生成，按形状分组后一次性写入图层。
+
+随机数统一由 make_rng(seed) 产生，种子固定时特效结果可复现，也就可以放心缓存。
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from .cache import register_content_cache
+
+
+def make_rng(seed=None):
+    """粒子位置、大小、颜色使用的随机数生成器；seed 为 None 时每次结果不同"""
+    return np.random.default_rng(seed)
+
+
+# ----------------------------------------------------------------------
+# 形状
+# ----------------------------------------------------------------------
+def _freeze_sprite(labels, anchor):
+    labels.flags.writeable = False
+    return labels, anchor
+
+
+@lru_cache(maxsize=256)
+def disc_sprite(radius):
+    """实心圆（与 cv2.circle(..., -1) 的像素一致），锚点为圆心"""
+    radius = int(radius)
+    size = 2 * radius + 1
+    labels = np.zeros((size, size), np.uint8)
+    cv2.circle(labels, (radius, radius), radius, 1, -1)
+    return _freeze_sprite(labels, (radius, radius))
+
+
+@lru_cache(maxsize=256)
+def rain_sprite(length, thickness):
+    """向右下倾斜的雨滴：每行一段宽 thickness 的短线，锚点为雨滴起点"""
+    length, thickness = int(length), int(thickness)
+    pad = thickness + 1
+    labels = np.zeros((length + 2 * pad, length // 3 + thickness + 2 * pad), np.uint8)
+    for i in range(length):
+        cv2.line(labels, (pad + i // 3, pad + i), (pad + i // 3 + thickness, pad + i), 1, thickness)
+    return _freeze_sprite(labels, (pad, pad))
+
+
+@lru_cache(maxsize=64)
+def blossom_sprite(size):
+    """五瓣樱花：标签 1 为花瓣，标签 2 为花心，锚点为花心"""
+    size = int(size)
+    pad = size + size // 2 + 1
+    labels = np.zeros((2 * pad + 1, 2 * pad + 1), np.uint8)
+    for angle in range(0, 360, 72):
+        rad = np.radians(angle)
+        px = pad + int(np.floor(size * np.cos(rad)))
+        py = pad + int(np.floor(size * np.sin(rad)))
+        cv2.circle(labels, (px, py), size // 2, 1, -1)
+    cv2.circle(labels, (pad, pad), size // 3, 2, -1)
+    return _freeze_sprite(labels, (pad, pad))
+
+
+@lru_cache(maxsize=64)
+def star_sprite(radius, rays=0):
+    """星星：rays 为 0 时只有圆点，1 时加四向光芒，2 时再加对角光芒；锚点为中心"""
+    radius, rays = int(radius), int(rays)
+    pad = radius + 3
+    labels = np.zeros((2 * pad + 1, 2 * pad + 1), np.uint8)
+    cv2.circle(labels, (pad, pad), radius, 1, -1)
+    if rays >= 1:
+        for dx, dy in [(2, 0), (-2, 0), (0, 2), (0, -2)]:
+            cv2.circle(labels, (pad + dx, pad + dy), max(1, radius - 1), 1, -1)
+    if rays >= 2:
+        for dx, dy in [(2, 2), (-2, 2), (2, -2), (-2, -2)]:
+            cv2.circle(labels, (pad + dx, pad + dy), 1, 1, -1)
+    return _freeze_sprite(labels, (pad, pad))
+
+
+@lru_cache(maxsize=16)
+def halo_sprite(core=2, rings=(3, 4, 5)):
+    """亮星：标签 1 为半径 core 的实心核，之后每个光晕圆环依次为标签 2、3…；锚点为中心"""
+    pad = max((core,) + tuple(rings)) + 1
+    labels = np.zeros((2 * pad + 1, 2 * pad + 1), np.uint8)
+    cv2.circle(labels, (pad, pad), core, 1, -1)
+    for index, radius in enumerate(rings):
+        cv2.circle(labels, (pad, pad), radius, index + 2, 1)
+    return _freeze_sprite(labels, (pad, pad))
+
+
+@register_content_cache
+def clear_sprite_cache():
+    """清空按尺寸缓存的粒子模板"""
+    for sprite in (disc_sprite, rain_sprite, blossom_sprite, star_sprite, halo_sprite):
+        sprite.cache_clear()
+
+
+# ----------------------------------------------------------------------
+# 批量绘制
+# ----------------------------------------------------------------------
+def stamp(layer, xs, ys, sprite, colors):
+    """
+    把同一形状的一批粒子写入图层（原地修改，超出边界的像素自动裁掉）
+
+    参数:
+    - layer: (H, W) 或 (H, W, C) 图层
+    - xs, ys: 粒子锚点坐标数组
+    - sprite: (标签图, (锚点行, 锚点列))
+    - colors: 各标签的颜色，(L, C) 表示所有粒子相同，(N, L, C) 表示逐粒子颜色；
+      第 k 个标签（从 1 开始）使用 colors[..., k-1, :]
+    """
+    xs = np.asarray(xs, np.int64)
+    ys = np.asarray(ys, np.int64)
+    if xs.size == 0:
+        return layer
+    labels, (anchor_y, anchor_x) = sprite
+    dy, dx = np.nonzero(labels)
+    label_index = labels[dy, dx].astype(np.intp) - 1
+
+    py = ys[:, None] + (dy - anchor_y)[None, :]
+    px = xs[:, None] + (dx - anchor_x)[None, :]
+    height, width = layer.shape[:2]
+    inside = (py >= 0) & (py < height) & (px >= 0) & (px < width)
+
+    colors = np.asarray(colors, layer.dtype)
+    values = colors[label_index] if colors.ndim == 2 else colors[:, label_index]
+    values = np.broadcast_to(values, py.shape + colors.shape[-1:])
+    if layer.ndim == 2:
+        values = values[..., 0]
+    layer[py[inside], px[inside]] = values[inside]
+    return layer
+
+
+def stamp_groups(layer, xs, ys, shapes, make_sprite, colors):
+    """
+    绘制形状参数各不相同的粒子：按形状参数分组，每组调用一次 stamp
+
+    参数:
+    - shapes: (N,) 或 (N, K) 整数数组，每个粒子的形状参数，传给 make_sprite(*参数)
+    - make_sprite: 返回 sprite 的函数（通常带缓存）
+    - colors: 同 stamp，逐粒子颜色时第一维与粒子对应
+    """
+    shapes = np.asarray(shapes)
+    if shapes.ndim == 1:
+        shapes = shapes[:, None]
+    if len(shapes) == 0:
+        return layer
+    colors = np.asarray(colors)
+    per_particle = colors.ndim == 3
+    keys, inverse = np.unique(shapes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    for index, key in enumerate(keys):
+        members = inverse == index
+        stamp(layer, xs[members], ys[members], make_sprite(*key.tolist()),
+              colors[members] if per_particle else colors)
+    return layer
@@ -0,0 +1,195 @@
+"""
+流水线执行器
+
+按顺序执行一串算子，每一步的中间结果和最终结果都写入结果缓存。
+第 i 步的缓存键 = hash(第 i-1 步的键, 算子, 参数)，只依赖参数而不依赖像素，
+所以执行前就能算出整条链的键，并从最靠后的已缓存步骤继续计算。
+
+声明了 point_ops 的相邻算子（对比度、伽马、量化、通道调整等逐像素映射）复合成一张查找表，
+整组只执行一次 cv2.LUT，结果与逐步执行完全一致；这样的一组只缓存最后一步的结果。
+
+指定 preview_side 时进入预览模式：算子在最长边不超过 preview_side 的代理图像上运行，
+与尺寸相关的参数按比例换算。代理图像本身也写入缓存，调参时不必重复缩放原图。
+
+指定 disk_cache 时，源图像登记为素材库图像的结果还会写入磁盘缓存（见 diskcache 模块），
+内存缓存未命中时先查磁盘，命中后放回内存缓存。
+"""
+from .cache import compute_image_hash, make_cache_key, freeze_result
+from .pointops import apply_point_ops
+from .preview import make_proxy, proxy_scale, scale_params
+
+PREVIEW_RETURNS = ("image", "images")
+
+
+class PipelineExecutor:
+    """带结果缓存的算子执行器"""
+
+    def __init__(self, registry, cache=None, disk_cache=None):
+        self.registry = registry
+        self.cache = cache
+        self.disk_cache = disk_cache
+
+    def step_key(self, source_key, name, params):
+        operator = self.registry.get(name)
+        return make_cache_key(source_key, name, params, operator.version)
+
+    def _persists(self, root_key):
+        return self.disk_cache is not None and self.disk_cache.accepts(root_key)
+
+    def _lookup(self, key, root_key):
+        """先查内存缓存，未命中且源图像可持久化时再查磁盘缓存"""
+        result = self.cache.get(key)
+        if result is None and self._persists(root_key):
+            result = self.disk_cache.get(key)
+            if result is not None:
+                self.cache.put(key, result)
+        return result
+
+    def _store(self, key, result, root_key):
+        self.cache.put(key, result)
+        if self._persists(root_key):
+            self.disk_cache.put(key, result)
+
+    def _compute(self, name, image, params):
+        return freeze_result(self.registry.resolve(name)(image, **params), image)
+
+    def _point_ops(self, name, params):
+        """算子对应的点运算列表，不是点运算时返回 None"""
+        point_ops = self.registry.get(name).point_ops
+        return None if point_ops is None else list(point_ops(params))
+
+    def _run_steps(self, image, steps, keys=None, root_key=None):
+        """
+        依次执行 steps，相邻的点运算合并为一次查表
+
+        keys 不为 None 时把结果写入缓存（合并执行的一组只写入最后一步）；
+        root_key 为原图哈希，用于判断是否写入磁盘缓存
+        """
+        result = image
+        index = 0
+        while index < len(steps):
+            name, params = steps[index]
+            ops = self._point_ops(name, params)
+            end = index + 1
+            if ops is not None:
+                while end < len(steps):
+                    more = self._point_ops(*steps[end])
+                    if more is None:
+                        break
+                    ops.extend(more)
+                    end += 1
+            if ops is not None and end - index > 1:
+                result = freeze_result(apply_point_ops(result, ops), result)
+            else:
+                result = self._compute(name, result, params)
+            if keys is not None:
+                self._store(keys[end - 1], result, root_key)
+            index = end
+        return result
+
+    def supports_preview(self, name):
+        """只有返回图像的算子才能在代理图像上预览（特征点坐标等与尺寸绑定的结果除外）"""
+        return self.registry.get(name).returns in PREVIEW_RETURNS
+
+    def needs_preview(self, image, names, preview_side):
+        """判断给定算子在该图像上是否会以预览分辨率执行"""
+        return (bool(preview_side) and proxy_scale(image, preview_side) < 1.0
+                and all(self.supports_preview(name) for name in names))
+
+    def get_proxy(self, image, preview_side, image_key=None):
+        """
+        获取代理图像
+
+        返回: (proxy, proxy_key, scale)
+        """
+        if image_key is None:
+            image_key = compute_image_hash(image)
+        proxy_key = make_cache_key(image_key, "__proxy__", {"max_side": int(preview_side)})
+        scale = proxy_scale(image, preview_side)
+        proxy = self.cache.get(proxy_key) if self.cache is not None else None
+        if proxy is None:
+            proxy, scale = make_proxy(image, preview_side)
+            proxy = freeze_result(proxy, image)
+            if self.cache is not None:
+                self.cache.put(proxy_key, proxy)
+        return proxy, proxy_key, scale
+
+    def run_operator(self, image, name, params=None, image_key=None, preview_side=None):
+        """
+        执行单个算子
+
+        参数:
+        - image: 输入图像（BGR）
+        - name: 注册表中的算子名
+        - params: 算子参数字典，缺省的参数使用声明中的默认值
+        - image_key: 已知的图像内容哈希，省略时自动计算
+        - preview_side: 预览代理图像的最长边，None 表示按全分辨率计算
+
+        返回: 算子结果；命中缓存时直接返回缓存对象（其中的数组为只读）
+        """
+        canonical = self.registry.canonical_params(name, params)
+        if self.cache is not None and image_key is None:
+            image_key = compute_image_hash(image)
+        root_key = image_key
+        if self.needs_preview(image, [name], preview_side):
+            image, image_key, scale = self.get_proxy(image, preview_side, image_key)
+            canonical = scale_params(self.registry.get(name), canonical, scale)
+        if self.cache is None:
+            return self._compute(name, image, canonical)
+
+        key = self.step_key(image_key, name, canonical)
+        result = self._lookup(key, root_key)
+        if result is None:
+            result = self._compute(name, image, canonical)
+            self._store(key, result, root_key)
+        return result
+
+    def run(self, image, steps, image_key=None, preview_side=None):
+        """
+        执行算子流水线
+
+        参数:
+        - image: 输入图像（BGR）
+        - steps: [(算子名, 参数字典), ...]，除最后一步外都必须返回图像
+        - image_key: 已知的图像内容哈希，省略时自动计算
+        - preview_side: 预览代理图像的最长边，None 表示按全分辨率计算
+
+        返回: 最后一步的结果
+        """
+        steps = [(name, self.registry.canonical_params(name, params)) for name, params in steps]
+        if not steps:
+            return image
+        for name, _ in steps[:-1]:
+            if self.registry.get(name).returns != "image":
+                raise ValueError(f"算子 {name} 不返回图像，只能作为流水线的最后一步")
+        if self.cache is not None and image_key is None:
+            image_key = compute_image_hash(image)
+        root_key = image_key
+        if self.needs_preview(image, [name for name, _ in steps], preview_side):
+            image, image_key, scale = self.get_proxy(image, preview_side, image_key)
+            steps = [(name, scale_params(self.registry.get(name), params, scale)) for name, params in steps]
+
+        if self.cache is None:
+            return self._run_steps(image, steps)
+
+        # 1. 预先计算每一步的缓存键
+        keys = []
+        source_key = image_key
+        for name, params in steps:
+            source_key = self.step_key(source_key, name, params)
+            keys.append(source_key)
+
+        # 2. 从后往前找到最靠后的已缓存结果
+        start = 0
+        result = image
+        for index in range(len(steps) - 1, -1, -1):
+            cached = self._lookup(keys[index], root_key)
+            if cached is not None:
+                if index == len(steps) - 1:
+                    return cached
+                start = index + 1
+                result = cached
+                break
+
+        # 3. 计算剩余步骤并写入缓存
+        return self._run_steps(result, steps[start:], keys[start:], root_key)
@@ -0,0 +1,196 @@
+"""
+点运算融合
+
+对比度、伽马、量化、通道偏移、按系数缩放等逐像素映射都可以写成 256 项的查找表。
+一串点运算先逐个生成 uint8 查找表，再按顺序复合（后一张表按前一张表的输出取值），
+结果与逐步计算（每一步都取整并饱和到 uint8）完全一致，整条链只需一次 cv2.LUT，
+不再为每一步生成整图的 float32 副本。编译后的查找表按运算参数缓存。
+
+运算可以只作用于部分通道，也可以在 HSV / LAB 颜色空间中进行（如饱和度、亮度调整），
+同一颜色空间中的多个通道调整同样合并为一次查表。
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from .cache import register_content_cache
+
+SPACES = {
+    None: (None, None),
+    "HSV": (cv2.COLOR_BGR2HSV, cv2.COLOR_HSV2BGR),
+    "LAB": (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR),
+}
+
+_IDENTITY = np.arange(256, dtype=np.uint8)
+
+
+@dataclass(frozen=True)
+class PointOp:
+    """
+    单个点运算
+
+    - kind: 运算类型（见 _TABLE_BUILDERS）
+    - args: 运算参数
+    - channels: 作用的通道下标，None 表示全部通道
+    """
+    kind: str
+    args: tuple = ()
+    channels: tuple = None
+
+    def __post_init__(self):
+        if self.kind not in _TABLE_BUILDERS:
+            raise ValueError(f"未知的点运算: {self.kind}")
+
+    def table(self):
+        return _op_table(self.kind, self.args)
+
+
+def _channels(channel):
+    if channel is None:
+        return None
+    return (int(channel),) if np.isscalar(channel) else tuple(int(item) for item in channel)
+
+
+def contrast(alpha, beta=0.0, channel=None):
+    """线性变换 |alpha·x + beta|，饱和到 [0, 255]（与 cv2.convertScaleAbs 一致）"""
+    return PointOp("contrast", (float(alpha), float(beta)), _channels(channel))
+
+
+def gamma(value, channel=None):
+    """伽马校正 255·(x/255)^(1/gamma)，截断取整"""
+    return PointOp("gamma", (float(value),), _channels(channel))
+
+
+def quantize(levels, channel=None):
+    """均匀量化为 levels 级"""
+    return PointOp("quantize", (int(levels),), _channels(channel))
+
+
+def offset(value, channel=None):
+    """加上常数并饱和（与 cv2.add 一致）"""
+    return PointOp("offset", (value,), _channels(channel))
+
+
+def scale(factor, channel=None):
+    """乘以系数，四舍五入并饱和（与 cv2.multiply 一致）"""
+    return PointOp("scale", (float(factor),), _channels(channel))
+
+
+def scale_floor(factor, channel=None):
+    """乘以系数后裁剪到 [0, 255] 并截断取整（与 float32 相乘再 astype(uint8) 一致）"""
+    return PointOp("scale_floor", (float(factor),), _channels(channel))
+
+
+def hue_shift(shift, channel=0):
+    """OpenCV 色调（0~179）循环偏移 (x + shift) % 180，用于 HSV 空间的 H 通道"""
+    return PointOp("hue_shift", (int(shift),), _channels(channel))
+
+
+def _contrast_table(alpha, beta):
+    return cv2.convertScaleAbs(_IDENTITY, alpha=alpha, beta=beta).ravel()
+
+
+def _gamma_table(value):
+    inv_gamma = 1.0 / value
+    return (((_IDENTITY / 255.0) ** inv_gamma) * 255).astype(np.uint8)
+
+
+def _quantize_table(levels):
+    levels = max(2, min(256, levels))
+    step = 256 / levels
+    values = np.round(_IDENTITY.astype(np.float32) / step) * step
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def _offset_table(value):
+    return cv2.add(_IDENTITY, value).ravel()
+
+
+def _scale_table(factor):
+    return cv2.multiply(_IDENTITY, factor).ravel()
+
+
+def _scale_floor_table(factor):
+    return np.clip(_IDENTITY.astype(np.float32) * factor, 0, 255).astype(np.uint8)
+
+
+def _hue_shift_table(shift):
+    return ((_IDENTITY + shift) % 180).astype(np.uint8)
+
+
+_TABLE_BUILDERS = {
+    "contrast": _contrast_table,
+    "gamma": _gamma_table,
+    "quantize": _quantize_table,
+    "offset": _offset_table,
+    "scale": _scale_table,
+    "scale_floor": _scale_floor_table,
+    "hue_shift": _hue_shift_table,
+}
+
+
+@lru_cache(maxsize=1024)
+def _op_table(kind, args):
+    table = _TABLE_BUILDERS[kind](*args)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=256)
+def compile_lut(ops, channels=3):
+    """
+    把点运算序列复合为一张查找表
+
+    参数:
+    - ops: PointOp 元组
+    - channels: 图像通道数
+
+    返回: 单通道图像为 (256,) 的表，多通道图像为 (256, 1, channels) 的逐通道表（只读）
+    """
+    tables = np.tile(_IDENTITY, (channels, 1))
+    for op in ops:
+        table = op.table()
+        targets = range(channels) if op.channels is None else op.channels
+        for channel in targets:
+            if channel < channels:
+                tables[channel] = table[tables[channel]]
+
+    if channels == 1:
+        lut = tables[0]
+    else:
+        lut = np.ascontiguousarray(tables.T.reshape(256, 1, channels))
+    lut.flags.writeable = False
+    return lut
+
+
+def apply_point_ops(image, ops, space=None):
+    """
+    对图像执行一串点运算（一次查表）
+
+    参数:
+    - image: uint8 图像（BGR 或灰度）
+    - ops: PointOp 序列
+    - space: None 表示直接在 BGR 通道上运算，"HSV" / "LAB" 表示先转换颜色空间再运算
+
+    返回: 新图像
+    """
+    ops = tuple(ops)
+    if not ops:
+        return image.copy()
+    forward, backward = SPACES[space]
+    if forward is not None:
+        image = cv2.cvtColor(image, forward)
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    result = cv2.LUT(image, compile_lut(ops, channels))
+    if backward is not None:
+        result = cv2.cvtColor(result, backward)
+    return result
+
+
+@register_content_cache
+def clear_lut_cache():
+    """清空按运算参数缓存的查找表"""
+    _op_table.cache_clear()
+    compile_lut.cache_clear()
@@ -0,0 +1,78 @@
+"""
+代理分辨率预览
+
+调参时在缩小后的代理图像上运行算子，与尺寸相关的参数（核大小、半径、距离、
+平移量、粒子数量等）按缩放比例换算，使预览效果与全分辨率结果保持一致。
+"""
+import cv2
+
+
+def proxy_scale(image, max_side):
+    """返回生成代理图像的缩放比例；图像本身不超过 max_side 时返回 1.0"""
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return 1.0
+    return max_side / float(longest)
+
+
+def make_proxy(image, max_side):
+    """
+    生成代理图像
+
+    返回: (proxy, scale)，scale 为代理图像相对原图的缩放比例
+    """
+    scale = proxy_scale(image, max_side)
+    if scale >= 1.0:
+        return image, 1.0
+    height, width = image.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def _clamp(value, lower, upper):
+    if lower is not None:
+        value = max(lower, value)
+    if upper is not None:
+        value = min(upper, value)
+    return value
+
+
+def _scale_value(mode, value, scale, is_int, lower, upper):
+    if mode == "kernel":
+        # 核尺寸保持为奇数
+        scaled = max(1, int(round(value * scale)))
+        if scaled % 2 == 0:
+            scaled += 1
+        return _clamp(scaled, lower, upper)
+
+    if mode == "length":
+        scaled = value * scale
+    elif mode == "area":
+        scaled = value * scale * scale
+    else:  # inverse
+        scaled = value / scale
+
+    if is_int:
+        # 长度、数量类参数至少保留 1，避免预览中效果完全消失
+        scaled = int(round(scaled))
+        if value > 0:
+            scaled = max(1, scaled)
+    return _clamp(scaled, lower, upper)
+
+
+def scale_param(spec, value, scale):
+    """按缩放比例换算单个参数"""
+    if spec.scale is None or scale == 1.0:
+        return value
+    if spec.kind == "vector":
+        return tuple(_scale_value(spec.scale, item, scale, isinstance(item, int), spec.min, spec.max)
+                     for item in value)
+    return _scale_value(spec.scale, value, scale, spec.kind == "int", spec.min, spec.max)
+
+
+def scale_params(operator, params, scale):
+    """按缩放比例换算算子的全部参数（params 须已规范化）"""
+    if scale == 1.0:
+        return dict(params)
+    return {spec.name: scale_param(spec, params[spec.name], scale) for spec in operator.params}
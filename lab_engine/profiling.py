@@ -0,0 +1,213 @@
+"""
+分阶段性能分析
+
+页面每次运行时调用 start_profiling() 为当前脚本线程创建一个记录器，
+解码、颜色转换、算子、直方图、显示编码、下载编码等阶段用 profile_stage() / profiled() 包裹，
+记录耗时和内存峰值增长，供页面在结果下方的“性能分析”面板中展示。
+每条阶段记录同时以 JSON 行写入滚动日志，可用
+    python -m lab_engine.profiling lab_profile.log --top 20
+汇总各算子、各阶段的耗时，找出生产环境中最慢的操作。
+未调用 start_profiling() 的线程（命令行工具、分块线程）中这些包装不做任何记录。
+"""
+import argparse
+import functools
+import glob
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from . import config
+
+_local = threading.local()
+_log_lock = threading.Lock()
+_log_handler = None
+
+
+# ----------------------------------------------------------------------
+# 内存
+# ----------------------------------------------------------------------
+def reset_peak_rss():
+    """重置进程的峰值 RSS 记录（Linux 4.0+），不支持时返回 False"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_rss():
+    """返回 (当前 RSS, 峰值 RSS)，单位字节"""
+    try:
+        values = {}
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0]) * 1024
+        return values["VmRSS"], values["VmHWM"]
+    except (OSError, KeyError, ValueError):
+        # 非 Linux 平台只能取进程生命周期内的峰值（macOS 单位为字节，Linux 为 KB）
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024
+        return peak, peak
+
+
+# ----------------------------------------------------------------------
+# 滚动日志
+# ----------------------------------------------------------------------
+def get_profile_logger():
+    """写入滚动日志的 logger（进程内只创建一次文件句柄）"""
+    global _log_handler
+    logger = logging.getLogger("lab_engine.profile")
+    with _log_lock:
+        if _log_handler is None and config.PROFILE_LOG:
+            _log_handler = logging.handlers.RotatingFileHandler(
+                config.PROFILE_LOG, maxBytes=config.PROFILE_LOG_MB * 1024 * 1024,
+                backupCount=config.PROFILE_LOG_BACKUPS, encoding="utf-8", delay=True,
+            )
+            _log_handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(_log_handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+# ----------------------------------------------------------------------
+# 阶段记录
+# ----------------------------------------------------------------------
+class StageProfiler:
+    """记录一次页面运行中各处理阶段的耗时和内存峰值增长"""
+
+    def __init__(self, log=True):
+        self.log = log and bool(config.PROFILE_LOG)
+        self._records = []
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, stage, label=""):
+        """
+        记录一个阶段
+
+        内存为阶段内进程 RSS 峰值相对阶段开始时的增长（进程级统计，
+        多个会话同时处理时会相互影响）；嵌套阶段不重置峰值，其内存值仅供参考。
+        """
+        outermost = self._depth == 0
+        rss_before, _ = read_rss()
+        resettable = reset_peak_rss() if outermost else False
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._depth -= 1
+            _, peak = read_rss()
+            record = {
+                "stage": stage,
+                "label": label,
+                "seconds": seconds,
+                "peak_mb": max(0, peak - rss_before) / 2 ** 20 if resettable or not outermost else None,
+            }
+            self._records.append(record)
+            if self.log:
+                get_profile_logger().info(json.dumps(
+                    dict(record, time=datetime.now().isoformat(timespec="seconds")), ensure_ascii=False))
+
+    def drain(self):
+        """取出并清空到目前为止的记录"""
+        records, self._records = self._records, []
+        return records
+
+
+def start_profiling(enabled=True, log=True):
+    """为当前线程（Streamlit 的脚本线程）创建新的记录器；enabled 为 False 时清除记录器"""
+    _local.profiler = StageProfiler(log) if enabled else None
+    return _local.profiler
+
+
+def current_profiler():
+    return getattr(_local, "profiler", None)
+
+
+@contextmanager
+def profile_stage(stage, label=""):
+    """在当前线程的记录器中记录一个阶段；没有记录器时直接执行"""
+    profiler = current_profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(stage, label):
+        yield
+
+
+def profiled(stage, label=""):
+    """把函数调用记录为一个阶段的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_stage(stage, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------
+# 日志汇总
+# ----------------------------------------------------------------------
+def summarize_profile_log(paths):
+    """
+    汇总滚动日志（含轮转出的备份文件）
+
+    返回: 按总耗时降序排列的 [{stage, label, count, total, mean, p95, max}, ...]
+    """
+    groups = {}
+    for path in paths:
+        for file in sorted(glob.glob(path) + glob.glob(path + ".*")):
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    groups.setdefault((record["stage"], record.get("label", "")), []).append(record["seconds"])
+
+    rows = []
+    for (stage, label), seconds in groups.items():
+        values = np.array(seconds)
+        rows.append({
+            "stage": stage, "label": label, "count": len(values), "total": float(values.sum()),
+            "mean": float(values.mean()), "p95": float(np.percentile(values, 95)), "max": float(values.max()),
+        })
+    rows.sort(key=lambda row: row["total"], reverse=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lab_engine.profiling",
+                                     description="汇总实验室性能分析日志")
+    parser.add_argument("logs", nargs="*", default=[config.PROFILE_LOG], help="日志文件路径")
+    parser.add_argument("--top", type=int, default=20, help="显示总耗时最多的前 N 项")
+    args = parser.parse_args(argv)
+
+    rows = summarize_profile_log(args.logs)
+    if not rows:
+        print("日志中没有记录")
+        return 1
+    print(f"{'阶段':10s} {'操作':28s} {'次数':>6s} {'总计(s)':>9s} {'平均(ms)':>9s} {'P95(ms)':>9s} {'最大(ms)':>9s}")
+    for row in rows[:args.top]:
+        print(f"{row['stage']:10s} {row['label'][:28]:28s} {row['count']:6d} {row['total']:9.2f} "
+              f"{row['mean'] * 1000:9.1f} {row['p95'] * 1000:9.1f} {row['max'] * 1000:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+算子注册表
+
+把实验室页面里的 apply_* / extract_* 处理函数包装成带参数声明的算子：
+- ParamSpec：单个参数的类型、默认值和取值范围
+- Operator：算子名称、对应的处理函数名、参数表和返回类型
+- OperatorRegistry：按名称查找算子，并把参数规范化为可哈希的形式
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+PARAM_KINDS = ("int", "float", "bool", "choice", "str", "vector")
+# 参数随图像尺寸的变化方式（预览时按缩放比例换算）：
+# length 像素长度（半径、距离、平移量），kernel 奇数核尺寸，
+# area 与面积成正比的数量，inverse 与长度成反比的系数
+SCALE_MODES = (None, "length", "kernel", "area", "inverse")
+RETURN_KINDS = ("image", "features", "table", "images")
+
+
+@dataclass(frozen=True)
+class ParamSpec:
+    """算子参数声明"""
+    name: str
+    kind: str
+    default: object = None
+    min: object = None
+    max: object = None
+    choices: tuple = ()
+    length: int = 0
+    label: str = ""
+    scale: str = None
+
+    def __post_init__(self):
+        if self.kind not in PARAM_KINDS:
+            raise ValueError(f"未知的参数类型: {self.kind}")
+        if self.scale not in SCALE_MODES:
+            raise ValueError(f"未知的尺度换算方式: {self.scale}")
+
+    def canonicalize(self, value):
+        """把参数值转换为规范形式（Python 基本类型），并检查取值范围"""
+        if self.kind == "int":
+            value = int(value)
+        elif self.kind == "float":
+            value = float(value)
+        elif self.kind == "bool":
+            value = bool(value)
+        elif self.kind == "str":
+            value = str(value)
+        elif self.kind == "choice":
+            value = value.item() if isinstance(value, np.generic) else value
+            if value not in self.choices:
+                raise ValueError(f"参数 {self.name} 的取值 {value!r} 不在可选项 {list(self.choices)} 中")
+            return value
+        else:  # vector
+            items = np.asarray(value).ravel().tolist()
+            if self.length and len(items) != self.length:
+                raise ValueError(f"参数 {self.name} 需要 {self.length} 个值，实际为 {len(items)} 个")
+            if self.min is not None and any(item < self.min for item in items):
+                raise ValueError(f"参数 {self.name} 的取值 {items} 小于下限 {self.min}")
+            if self.max is not None and any(item > self.max for item in items):
+                raise ValueError(f"参数 {self.name} 的取值 {items} 大于上限 {self.max}")
+            return tuple(items)
+
+        if self.min is not None and value < self.min:
+            raise ValueError(f"参数 {self.name} 的取值 {value} 小于下限 {self.min}")
+        if self.max is not None and value > self.max:
+            raise ValueError(f"参数 {self.name} 的取值 {value} 大于上限 {self.max}")
+        return value
+
+
+@dataclass(frozen=True)
+class Operator:
+    """
+    图像处理算子声明
+
+    func_name 是处理函数在命名空间中的名字，调用时才解析，
+    这样 Streamlit 每次重跑页面重新定义函数后，注册表仍然指向最新的实现。
+    version 在算法实现变化时递增，使旧的缓存结果自动失效。
+    point_ops 是可选的 参数字典 → PointOp 列表 的函数，声明该算子是 BGR 通道上的逐像素映射，
+    流水线中相邻的此类算子会复合成一张查找表一次执行。
+    """
+    name: str
+    func_name: str
+    label: str
+    category: str
+    params: tuple = ()
+    returns: str = "image"
+    version: int = 1
+    description: str = ""
+    point_ops: object = None
+
+    def __post_init__(self):
+        if self.returns not in RETURN_KINDS:
+            raise ValueError(f"算子 {self.name} 的返回类型未知: {self.returns}")
+
+    def get_param(self, name):
+        for spec in self.params:
+            if spec.name == name:
+                return spec
+        raise KeyError(name)
+
+    def default_params(self):
+        return {spec.name: spec.canonicalize(spec.default) for spec in self.params}
+
+
+class OperatorRegistry:
+    """按名称管理算子，并把算子名解析为命名空间中的处理函数"""
+
+    def __init__(self, namespace=None, operators=()):
+        self.namespace = namespace if namespace is not None else {}
+        self._operators = {}
+        for operator in operators:
+            self.register(operator)
+
+    def register(self, operator):
+        if operator.name in self._operators:
+            raise ValueError(f"算子 {operator.name} 已注册")
+        self._operators[operator.name] = operator
+        return operator
+
+    def get(self, name):
+        try:
+            return self._operators[name]
+        except KeyError:
+            raise KeyError(f"未注册的算子: {name}") from None
+
+    def __contains__(self, name):
+        return name in self._operators
+
+    def __iter__(self):
+        return iter(self._operators.values())
+
+    def names(self, category=None):
+        return [op.name for op in self._operators.values()
+                if category is None or op.category == category]
+
+    def categories(self):
+        return list(dict.fromkeys(op.category for op in self._operators.values()))
+
+    def resolve(self, name):
+        """返回算子对应的处理函数"""
+        operator = self.get(name)
+        func = self.namespace.get(operator.func_name)
+        if func is None:
+            raise LookupError(f"算子 {name} 的处理函数 {operator.func_name} 未定义")
+        return func
+
+    def canonical_params(self, name, params=None):
+        """补全默认值并规范化参数，未声明的参数直接报错"""
+        operator = self.get(name)
+        params = dict(params or {})
+        unknown = set(params) - {spec.name for spec in operator.params}
+        if unknown:
+            raise ValueError(f"算子 {name} 不支持参数: {sorted(unknown)}")
+        return {
+            spec.name: spec.canonicalize(params.get(spec.name, spec.default))
+            for spec in operator.params
+        }
+
+    def call(self, name, image, params=None):
+        """直接调用算子（不经过缓存）"""
+        canonical = self.canonical_params(name, params)
+        return self.resolve(name)(image, **canonical)
@@ -0,0 +1,103 @@
+"""
+笔触与几何块渲染
+
+绘画风格（莫奈、毕加索等）把图像划分为网格，每个网格画一笔或一个几何块：
+- 网格颜色一次性算出：点取样直接对（可缩小的）颜色图做数组索引，区域平均用积分图 O(1) 求和；
+- 笔触方向、长度、多边形顶点等随机量用 NumPy 一次生成，绘制时只剩一个紧凑的绘制循环，
+  不再在每个网格里调用随机数、三角函数和 cv2.mean；
+颜色简化见 palette 模块。
+"""
+import cv2
+import numpy as np
+
+
+def grid_points(height, width, step):
+    """网格左上角坐标，返回按行优先排列的 (xs, ys)"""
+    ys, xs = np.mgrid[0:height:step, 0:width:step]
+    return xs.ravel(), ys.ravel()
+
+
+def downsample(image, factor):
+    """按整数倍缩小（面积插值），factor <= 1 时原样返回"""
+    if factor <= 1:
+        return image
+    height, width = image.shape[:2]
+    size = (max(1, width // factor), max(1, height // factor))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def sample_colors(image, xs, ys, factor=1):
+    """在坐标 (xs, ys) 处取颜色；image 为按 factor 缩小后的图像时坐标自动换算"""
+    height, width = image.shape[:2]
+    rows = np.minimum(np.asarray(ys) // factor, height - 1)
+    cols = np.minimum(np.asarray(xs) // factor, width - 1)
+    return image[rows, cols]
+
+
+def region_means(image, x0, y0, x1, y1):
+    """
+    用积分图一次求出多个矩形区域 [y0, y1) × [x0, x1) 的平均颜色
+
+    返回: (N, C) float64，空区域的平均值为 0
+    """
+    height, width = image.shape[:2]
+    x0 = np.clip(x0, 0, width)
+    x1 = np.clip(x1, 0, width)
+    y0 = np.clip(y0, 0, height)
+    y1 = np.clip(y1, 0, height)
+    integral = cv2.integral(image, sdepth=cv2.CV_64F)
+    if integral.ndim == 2:
+        integral = integral[:, :, None]
+    sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    area = np.maximum((y1 - y0) * (x1 - x0), 0)
+    means = sums / np.maximum(area, 1)[:, None]
+    means[area == 0] = 0
+    return means
+
+
+def draw_strokes(canvas, starts, ends, colors, thickness):
+    """
+    按顺序绘制一批线段笔触（后画的覆盖先画的）
+
+    参数:
+    - starts, ends: (N, 2) 起点、终点坐标 (x, y)
+    - colors: (N, C) 颜色
+    - thickness: 笔触宽度
+    """
+    line = cv2.line
+    starts = np.asarray(starts, np.int64).tolist()
+    ends = np.asarray(ends, np.int64).tolist()
+    for start, end, color in zip(starts, ends, np.asarray(colors).tolist()):
+        line(canvas, start, end, color, thickness)
+    return canvas
+
+
+def _boxes_overlap(box, boxes):
+    x0, y0, x1, y1 = box
+    return any(x0 <= bx1 and bx0 <= x1 and y0 <= by1 and by0 <= y1 for bx0, by0, bx1, by1 in boxes)
+
+
+def fill_polygons(canvas, polygons, colors):
+    """
+    按顺序填充一批多边形
+
+    cv2.fillPoly 一次填充多个多边形时按奇偶规则处理，重叠部分会被留空，
+    因此只把相邻、颜色相同且外接矩形互不相交的多边形合并为一次调用。
+    """
+    colors = np.asarray(colors).tolist()
+    batch = []
+    boxes = []
+    batch_color = None
+    for polygon, color in zip(polygons, colors):
+        polygon = np.asarray(polygon, np.int32).reshape(-1, 2)
+        box = (*polygon.min(axis=0).tolist(), *polygon.max(axis=0).tolist())
+        if batch and (color != batch_color or _boxes_overlap(box, boxes)):
+            cv2.fillPoly(canvas, batch, batch_color)
+            batch = []
+            boxes = []
+        batch.append(polygon)
+        boxes.append(box)
+        batch_color = color
+    if batch:
+        cv2.fillPoly(canvas, batch, batch_color)
+    return canvas
@@ -0,0 +1,98 @@
+"""
+分块多线程执行
+
+把大图切成带重叠边（halo）的图块，在线程池中并行处理后再拼接。
+halo 不小于滤波器的邻域半径时，图块内部区域的结果与整图处理完全一致；
+图块贴着原图边界时，OpenCV 的边界填充方式也与整图处理相同。
+OpenCV 的函数在计算时会释放 GIL，因此多线程可以利用多核。
+每个图块只需要自己大小的临时内存，整图只保留一份输出，峰值内存有界。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tile_pool():
+    """进程内共享的图块线程池（延迟创建）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = config.TILE_WORKERS or os.cpu_count() or 1
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lab-tile")
+        return _pool
+
+
+def tile_grid(height, width, tile_size, halo, align=1):
+    """
+    计算图块划分
+
+    参数:
+    - tile_size: 图块（不含重叠边）的边长
+    - halo: 每个方向额外读取的像素数
+    - align: 图块起点和重叠边对齐到该值的倍数（图像金字塔类算法需要）
+
+    返回: [(核心区域切片, 读取区域切片, 核心区域在读取区域中的切片), ...]
+    """
+    tile_size = max(align, tile_size - tile_size % align)
+    halo = -(-halo // align) * align
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        y1 = min(height, y0 + tile_size)
+        py0, py1 = max(0, y0 - halo), min(height, y1 + halo)
+        for x0 in range(0, width, tile_size):
+            x1 = min(width, x0 + tile_size)
+            px0, px1 = max(0, x0 - halo), min(width, x1 + halo)
+            tiles.append((
+                (slice(y0, y1), slice(x0, x1)),
+                (slice(py0, py1), slice(px0, px1)),
+                (slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0)),
+            ))
+    return tiles
+
+
+def run_tiled(func, image, halo, tile_size=None, align=1, min_pixels=None):
+    """
+    分块并行执行逐邻域的图像处理函数
+
+    参数:
+    - func: 输入图块、返回同尺寸结果的函数
+    - image: 输入图像
+    - halo: 函数的邻域半径（像素）
+    - tile_size: 图块边长，默认取配置 LAB_TILE_SIZE
+    - align: 图块对齐（见 tile_grid）
+    - min_pixels: 小于该像素数的图像直接整图处理，默认取配置 LAB_TILE_MIN_PIXELS
+
+    返回: 与整图调用 func(image) 相同的结果
+    """
+    tile_size = tile_size or config.TILE_SIZE
+    min_pixels = config.TILE_MIN_PIXELS if min_pixels is None else min_pixels
+    height, width = image.shape[:2]
+    if height * width < min_pixels or (height <= tile_size and width <= tile_size):
+        return func(image)
+
+    tiles = tile_grid(height, width, tile_size, halo, align)
+    if len(tiles) == 1:
+        return func(image)
+
+    def process(tile):
+        core, read, inner = tile
+        return core, func(image[read])[inner]
+
+    # 已经在图块线程中时直接串行处理，避免线程池嵌套等待
+    if threading.current_thread().name.startswith("lab-tile"):
+        pool_map = map
+    else:
+        pool_map = get_tile_pool().map
+    output = None
+    for core, result in pool_map(process, tiles):
+        if output is None:
+            output = np.empty((height, width) + result.shape[2:], dtype=result.dtype)
+        output[core] = result
+    return output